@@ -0,0 +1,491 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+from api.filters import FILTER_COLUMNS, ValueIndex
+from api.models import Book
+from api.ranking import RANKED_COLUMNS, RankedPostings, TextIndex
+
+# Formato binário do catálogo (ex: data/books.bin), gerado a partir do CSV.
+# Layout (little-endian):
+#   cabeçalho  -> HEADER (40 bytes)
+#   tamanhos   -> quantos itens tem cada seção, na ordem de SECTIONS (8 bytes cada)
+#   seções     -> arrays na ordem de SECTIONS, cada uma começando num múltiplo de 8 bytes
+# Os textos ficam todos na seção strings (UTF-8), localizados por string_offsets;
+# string_counts diz quantos textos tem cada grupo de STRING_GROUPS, em ordem.
+# A seção json é o catálogo completo já serializado ([livro,livro,...]), com o
+# início de cada livro em json_offsets. A seção payloads guarda as variantes
+# gzip/brotli dos corpos servidos inteiros, nomeadas no grupo 'payload'.
+MAGIC = b'BOOKSBIN'
+FORMAT_VERSION = 5
+
+# magic, versão, reservado, N livros, C categorias, crc32 do resto do arquivo,
+# tamanho e mtime_ns do CSV de origem
+HEADER = struct.Struct('<8sHHIIIQq')
+
+# Alinhamento do início de cada seção
+ALIGNMENT = 8
+
+# (nome, typecode) de cada seção
+SECTIONS = [
+    # Colunas do snapshot
+    ('prices', 'd'),
+    ('price_keys', 'd'),
+    ('ratings', 'i'),
+    ('rating_keys', 'i'),
+    ('category_codes', 'I'),
+    ('availability_codes', 'I'),
+    ('price_order', 'I'),
+    ('rating_order', 'I'),
+    ('title_order', 'I'),
+    # Textos e catálogo serializado
+    ('string_counts', 'Q'),
+    ('string_offsets', 'Q'),
+    ('strings', 'B'),
+    ('json_offsets', 'Q'),
+    ('json', 'B'),
+    # Variantes comprimidas dos corpos servidos inteiros (snapshot.payloads)
+    ('payload_offsets', 'Q'),
+    ('payloads', 'B'),
+    # Índice de trigramas dos títulos (chaves no grupo 'trigram')
+    ('trigram_offsets', 'Q'),
+    ('trigram_postings', 'I'),
+    # Índice de tokens (TextIndex.columns()): vocabulário no grupo 'term' e
+    # trigramas do vocabulário no grupo 'fuzzy_trigram'
+    ('text_postings', 'I'),
+    ('text_offsets', 'I'),
+    ('text_lengths', 'H'),
+    ('text_ranked_terms', 'I'),
+    ('text_ranked_term_groups', 'I'),
+    ('text_ranked_group_tfs', 'I'),
+    ('text_ranked_group_offsets', 'I'),
+    ('text_ranked_postings', 'I'),
+    ('fuzzy_offsets', 'I'),
+    ('fuzzy_postings', 'I'),
+    # Índices por valor dos filtros de /books (ValueIndex de cada coluna de FILTER_COLUMNS)
+] + [
+    (f'{column}_index_{name}', typecode)
+    for column in FILTER_COLUMNS
+    for name, typecode in (('values', 'i'), ('offsets', 'I'), ('positions', 'I'))
+]
+
+# Quantos itens tem cada seção
+LENGTHS = struct.Struct(f'<{len(SECTIONS)}Q')
+
+# Colunas que viram atributos do snapshot (as demais são índices internos do formato)
+COLUMN_NAMES = (
+    'prices', 'price_keys', 'ratings', 'rating_keys', 'category_codes',
+    'availability_codes', 'price_order', 'rating_order', 'title_order',
+)
+
+# Grupos de textos da seção strings, em ordem: título, URL da imagem e título
+# em minúsculas de cada livro, os nomes das categorias e das disponibilidades
+# (código -> nome), as chaves dos índices e os nomes das variantes
+# comprimidas ("nome:codificação", na ordem da seção payloads)
+STRING_GROUPS = (
+    'title', 'image_url', 'title_lower', 'category', 'availability', 'trigram', 'term', 'fuzzy_trigram', 'payload',
+)
+
+
+class BinaryCatalogError(ValueError):
+    """Arquivo binário do catálogo inválido, corrompido ou de outra versão"""
+
+
+def binary_path_for(csv_path: str) -> str:
+    """Caminho do arquivo binário que acompanha um CSV (books.csv -> books.bin)"""
+    root, _ = os.path.splitext(csv_path)
+    return root + '.bin'
+
+
+def csv_fingerprint(csv_path: str) -> Tuple[int, int]:
+    """Identifica o CSV de origem por (tamanho, mtime_ns)"""
+    info = os.stat(csv_path)
+    return info.st_size, info.st_mtime_ns
+
+
+def write_binary_catalog(path: str, snapshot, source_fingerprint: Tuple[int, int] = (0, 0)):
+    """Grava um snapshot no formato binário (arquivo temporário + rename atômico)
+
+    `snapshot` é um CatalogSnapshot já montado: além das colunas, o arquivo
+    guarda os títulos em minúsculas, os índices (trigramas, tokens, ordem do
+    autocomplete e filtros), o JSON de cada livro e as variantes comprimidas
+    de snapshot.payloads, para que possam ser usados direto do arquivo.
+    """
+    books_data = snapshot.books_data
+    count = len(books_data)
+    category_names = snapshot.category_names
+    text_index = snapshot.text_index
+    trigram_keys, trigram_offsets, trigram_postings = _pack_index(snapshot.title_trigrams, 'Q')
+    fuzzy_keys, fuzzy_offsets, fuzzy_postings = _pack_index(text_index.fuzzy, 'I')
+    compressed = sorted(
+        (f'{name}:{encoding}', body) for (name, encoding), body in snapshot.payloads.items() if encoding is not None
+    )
+    payloads, payload_offsets = _pack_blobs(body for _, body in compressed)
+
+    # Bloco de strings e offsets de cada texto dentro dele
+    groups = {field: [book[field] for book in books_data] for field in ('title', 'image_url')}
+    groups.update(
+        title_lower=list(snapshot.titles_lower),
+        category=list(category_names),
+        availability=list(snapshot.availability_names),
+        trigram=trigram_keys,
+        term=list(text_index.terms),
+        fuzzy_trigram=fuzzy_keys,
+        payload=[key for key, _ in compressed],
+    )
+    strings, string_offsets = _pack_blobs(text.encode('utf-8') for name in STRING_GROUPS for text in groups[name])
+
+    # JSON completo e a posição onde cada livro começa dentro dele
+    rows_json, json_offsets = _pack_blobs(snapshot.book_rows_json, separator=b',')
+    json_offsets = array('Q', (offset + 1 for offset in json_offsets))
+    json_offsets[-1] += 1  # Depois do último livro vem o ']'
+    rows_json = b'[' + rows_json + b']'
+
+    sections = {name: getattr(snapshot, name) for name in COLUMN_NAMES}
+    sections.update((f'text_{name}', column) for name, column in text_index.columns().items())
+    for column in FILTER_COLUMNS:
+        index = snapshot.filter_index.value_index(column)
+        sections.update({
+            f'{column}_index_values': index.values,
+            f'{column}_index_offsets': index.offsets,
+            f'{column}_index_positions': index.positions,
+        })
+    sections.update(
+        string_counts=array('Q', (len(groups[name]) for name in STRING_GROUPS)),
+        string_offsets=string_offsets,
+        strings=strings,
+        json_offsets=json_offsets,
+        json=rows_json,
+        payload_offsets=payload_offsets,
+        payloads=payloads,
+        trigram_offsets=trigram_offsets,
+        trigram_postings=trigram_postings,
+        fuzzy_offsets=fuzzy_offsets,
+        fuzzy_postings=fuzzy_postings,
+    )
+
+    lengths = []
+    chunks = []
+    for name, typecode in SECTIONS:
+        data = _section_bytes(sections[name], typecode)
+        lengths.append(len(data) // array(typecode).itemsize)
+        chunks.append(data + bytes(-len(data) % ALIGNMENT))
+    body = LENGTHS.pack(*lengths) + b''.join(chunks)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, count, len(category_names),
+        zlib.crc32(body), source_fingerprint[0], source_fingerprint[1],
+    )
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(header)
+        file.write(body)
+    os.replace(tmp_path, path)
+
+
+def _pack_index(index, offset_typecode: str) -> Tuple[List[str], array, array]:
+    """Chaves ordenadas de um índice chave -> posições, os offsets e as postagens concatenadas"""
+    keys = sorted(index)
+    postings = array('I')
+    offsets = array(offset_typecode, [0])
+    for key in keys:
+        postings.extend(index[key])
+        offsets.append(len(postings))
+    return keys, offsets, postings
+
+
+def _pack_blobs(chunks, separator: bytes = b'') -> Tuple[bytes, array]:
+    """Concatena pedaços de bytes e retorna o bloco e o offset de início de cada um (+ o fim)"""
+    chunks = list(chunks)
+    offsets = array('Q', [0])
+    size = 0
+    for chunk in chunks:
+        size += len(chunk) + len(separator)
+        offsets.append(size)
+    if chunks and separator:
+        offsets[-1] -= len(separator)
+    return separator.join(chunks), offsets
+
+
+def _section_bytes(column, typecode: str) -> bytes:
+    """Bytes de uma seção no typecode dela, em little-endian, independente da máquina"""
+    if typecode == 'B':
+        return bytes(column)
+    if not isinstance(column, array) or column.typecode != typecode or sys.byteorder == 'big':
+        column = array(typecode, column)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+class BinaryCatalog:
+    """Visões (sem cópia) sobre as seções de um catálogo binário
+
+    O buffer pode ser um bytes lido do disco ou um mmap somente leitura.
+    No segundo caso, todos os workers que mapeiam o mesmo arquivo
+    compartilham as mesmas páginas físicas de memória.
+    """
+
+    def __init__(self, buffer, verify_checksum: bool = True):
+        if len(buffer) < HEADER.size + LENGTHS.size:
+            raise BinaryCatalogError("Arquivo binário truncado")
+
+        magic, version, _, count, category_count, checksum, csv_size, csv_mtime = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise BinaryCatalogError("Arquivo não é um catálogo binário")
+        if version != FORMAT_VERSION:
+            raise BinaryCatalogError(f"Versão do formato binário não suportada: {version}")
+        if sys.byteorder == 'big':
+            raise BinaryCatalogError("Catálogo binário só pode ser lido em máquinas little-endian")
+
+        lengths = LENGTHS.unpack_from(buffer, HEADER.size)
+        sizes = [length * array(typecode).itemsize for (_, typecode), length in zip(SECTIONS, lengths)]
+        if len(buffer) != HEADER.size + LENGTHS.size + sum(size + -size % ALIGNMENT for size in sizes):
+            raise BinaryCatalogError("Tamanho do arquivo binário não bate com o cabeçalho")
+
+        view = memoryview(buffer)
+        if verify_checksum and zlib.crc32(view[HEADER.size:]) != checksum:
+            raise BinaryCatalogError("Checksum do arquivo binário não confere")
+
+        self.buffer = buffer
+        self.count = count
+        self.category_count = category_count
+        self.source_fingerprint = (csv_size, csv_mtime)
+
+        # Cada seção vira um memoryview tipado direto sobre o buffer
+        self.sections: Dict[str, memoryview] = {}
+        position = HEADER.size + LENGTHS.size
+        for (name, typecode), size in zip(SECTIONS, sizes):
+            self.sections[name] = view[position:position + size].cast(typecode)
+            position += size + -size % ALIGNMENT
+
+        # Primeira posição (em string_offsets) e quantidade de cada grupo de textos
+        self._string_groups: Dict[str, Tuple[int, int]] = {}
+        start = 0
+        for name, length in zip(STRING_GROUPS, self.sections['string_counts']):
+            self._string_groups[name] = (start, length)
+            start += length
+
+        self.json = self.sections['json']
+
+    def strings(self, group: str) -> 'StringTable':
+        """Textos de um grupo de STRING_GROUPS, decodificados sob demanda"""
+        start, length = self._string_groups[group]
+        return StringTable(self.sections['strings'], self.sections['string_offsets'], start, length)
+
+    def field(self, name: str) -> 'StringTable':
+        """Strings de um campo de texto dos livros (título ou URL da imagem)"""
+        return self.strings(name)
+
+    def titles_lower(self) -> 'StringTable':
+        """Títulos em minúsculas, na ordem dos livros"""
+        return self.strings('title_lower')
+
+    def category_names(self) -> List[str]:
+        """Nomes das categorias (código -> nome)"""
+        return list(self.strings('category'))
+
+    def availability_names(self) -> List[str]:
+        """Nomes das disponibilidades (código -> nome)"""
+        return list(self.strings('availability'))
+
+    def trigram_index(self) -> 'MappedTrigramIndex':
+        """Índice de trigramas dos títulos, lido direto do arquivo"""
+        sections = self.sections
+        return MappedTrigramIndex(self.strings('trigram'), sections['trigram_offsets'], sections['trigram_postings'])
+
+    def text_index(self, titles_lower: Sequence[str]) -> TextIndex:
+        """Índice de tokens (BM25 e busca aproximada), lido direto do arquivo"""
+        sections = self.sections
+        ranked = RankedPostings(*(sections[f'text_ranked_{name}'] for name in RANKED_COLUMNS))
+        fuzzy = MappedTrigramIndex(self.strings('fuzzy_trigram'), sections['fuzzy_offsets'], sections['fuzzy_postings'])
+        return TextIndex(
+            titles_lower, self.strings('term'),
+            sections['text_postings'], sections['text_offsets'], sections['text_lengths'],
+            ranked, fuzzy,
+        )
+
+    def filter_indexes(self) -> Dict[str, ValueIndex]:
+        """Índices por valor de cada coluna de FILTER_COLUMNS, lidos direto do arquivo"""
+        sections = self.sections
+        return {
+            column: ValueIndex(*(sections[f'{column}_index_{name}'] for name in ('values', 'offsets', 'positions')))
+            for column in FILTER_COLUMNS
+        }
+
+    def book_rows_json(self) -> 'JsonRows':
+        """JSON de cada livro, como fatias do bloco de JSON"""
+        return JsonRows(self.json, self.sections['json_offsets'])
+
+    def payloads(self) -> Dict[Tuple[str, str], memoryview]:
+        """Variantes comprimidas gravadas no arquivo, por (nome, codificação)"""
+        blob = self.sections['payloads']
+        offsets = self.sections['payload_offsets']
+        payloads = {}
+        for i, key in enumerate(self.strings('payload')):
+            name, _, encoding = key.rpartition(':')
+            payloads[(name, encoding)] = blob[offsets[i]:offsets[i + 1]]
+        return payloads
+
+
+class StringTable(Sequence):
+    """Sequência de strings decodificadas sob demanda a partir da tabela de offsets"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview, start: int, length: int):
+        self._blob = blob
+        self._offsets = offsets
+        self._start = start
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        position = self._start + index
+        return str(self._blob[self._offsets[position]:self._offsets[position + 1]], 'utf-8')
+
+
+class JsonRows(Sequence):
+    """JSON de cada livro como fatias (memoryview) do catálogo serializado"""
+
+    def __init__(self, catalog_json: memoryview, offsets: memoryview):
+        self._json = catalog_json
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        # O fim de cada livro é o byte antes da ',' (ou do ']') seguinte
+        return self._json[self._offsets[index]:self._offsets[index + 1] - 1]
+
+    def memory_usage(self) -> dict:
+        """Bytes da tabela de offsets quando ela está na memória do processo"""
+        if isinstance(self._offsets, memoryview):
+            return {'offsets': 0}
+        return {'offsets': self._offsets.itemsize * len(self._offsets)}
+
+
+class MappedTrigramIndex:
+    """Índice trigrama -> posições com a mesma interface de dict.get do índice em memória"""
+
+    def __init__(self, keys: StringTable, offsets: memoryview, postings: memoryview):
+        self._keys = keys
+        self._offsets = offsets
+        self._postings = postings
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, gram: str, default=None):
+        """Lista de postagens do trigrama (busca binária nas chaves ordenadas)"""
+        i = bisect_left(self._keys, gram)
+        if i == len(self._keys) or self._keys[i] != gram:
+            return default
+        return self._postings[self._offsets[i]:self._offsets[i + 1]]
+
+
+class MappedRows(Sequence):
+    """Linhas do catálogo (dicts) montadas sob demanda a partir das colunas mapeadas"""
+
+    def __init__(self, catalog: BinaryCatalog, category_names: List[str], availability_names: List[str]):
+        self._titles = catalog.field('title')
+        self._image_urls = catalog.field('image_url')
+        self._prices = catalog.sections['prices']
+        self._ratings = catalog.sections['ratings']
+        self._codes = catalog.sections['category_codes']
+        self._category_names = category_names
+        self._availability_codes = catalog.sections['availability_codes']
+        self._availability_names = availability_names
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return {
+            'title': self._titles[index],
+            'price': self._prices[index],
+            'rating': self._ratings[index],
+            'availability': self._availability_names[self._availability_codes[index]],
+            'category': self._category_names[self._codes[index]],
+            'image_url': self._image_urls[index],
+            'id': index + 1,
+        }
+
+
+class MappedBooks(Sequence):
+    """Objetos Book criados sob demanda a partir das linhas (MappedRows ou BookRows), sem cache"""
+
+    def __init__(self, rows: Sequence):
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        # Os tipos já são garantidos pelo formato binário ou pela validação na carga,
+        # mas model_validate (feito em Rust) sai mais barato que model_construct
+        return Book.model_validate(self._rows[index])
+
+
+def read_binary_catalog(path: str) -> BinaryCatalog:
+    """Lê o catálogo binário inteiro para a memória do processo
+
+    Nada é convertido: o snapshot usa as mesmas visões sobre as seções que
+    o modo mapeado, só que sobre um bytes privado em vez do mmap.
+    """
+    with open(path, 'rb') as file:
+        return BinaryCatalog(file.read())
+
+
+def map_binary_catalog(path: str) -> BinaryCatalog:
+    """Mapeia o catálogo binário em memória somente leitura (compartilhada entre processos)"""
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return BinaryCatalog(buffer)
+
+
+def load_fresh_binary_catalog(csv_path: str, use_mmap: bool = False) -> Optional[BinaryCatalog]:
+    """Abre o binário que acompanha o CSV, se existir e tiver sido gerado dele
+
+    Retorna o BinaryCatalog mapeado em memória (use_mmap=True) ou lido para a
+    memória do processo. Retorna None (para cair no CSV) se o binário não
+    existe, está desatualizado em relação ao CSV ou é inválido.
+    """
+    path = binary_path_for(csv_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        catalog = map_binary_catalog(path) if use_mmap else read_binary_catalog(path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignorando {path}: {e}")
+        return None
+
+    if os.path.exists(csv_path) and catalog.source_fingerprint != csv_fingerprint(csv_path):
+        print(f"⚠️  Ignorando {path}: gerado de outra versão de {csv_path}")
+        return None
+    return catalog
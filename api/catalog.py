@@ -0,0 +1,446 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from array import array
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+from api.binary_format import (
+    BinaryCatalog, JsonRows, MappedBooks, MappedRows, binary_path_for, csv_fingerprint,
+    load_fresh_binary_catalog, write_binary_catalog,
+)
+from api.compression import precompress
+from api.filters import FilterIndex, ValueIndex, build_value_index
+from api.models import Book, CategoryStats, StatsResponse
+from api.ranking import TextIndex, build_text_index
+from api.rows import BookRows, encode_values
+from api.search import build_title_order, build_trigram_index
+
+# orjson é opcional: sem ele, o JSON da carga é gerado com o json da biblioteca padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@dataclass(frozen=True, eq=False)
+class CatalogSnapshot:
+    """Catálogo carregado junto com todos os índices derivados dele
+
+    É montado por inteiro antes de ser publicado e nunca é alterado depois,
+    então uma requisição sempre enxerga uma versão completa dos dados.
+    Todas as listas e arrays por livro usam a posição id - 1.
+    """
+    books_data: Sequence[dict]  # Linhas do catálogo (BookRows ou MappedRows), montadas sob demanda
+    books_by_id: Sequence[Book]  # Book de cada livro, criado sob demanda a partir da linha
+
+    # Títulos em minúsculas e índice invertido de trigramas
+    titles_lower: List[str]
+    title_trigrams: Dict[str, array]
+
+    # Índice de tokens dos títulos, para a busca por relevância (BM25)
+    text_index: TextIndex
+
+    # Colunas numéricas contíguas
+    prices: array
+    ratings: array
+    category_codes: array
+    category_names: List[str]  # código -> nome, em ordem alfabética
+    availability_codes: array
+    availability_names: List[str]  # código -> nome, em ordem alfabética
+
+    # Posições ordenadas por (preço, id) e por (-rating, id), com as chaves
+    # de ordenação em arrays próprios para busca binária
+    price_order: array
+    price_keys: array
+    rating_order: array
+    rating_keys: array  # -rating, para ficar em ordem crescente
+
+    # Posições ordenadas por (-rating, título em minúsculas, id), para o
+    # autocomplete; os blocos de rating têm os mesmos limites de rating_keys
+    title_order: array
+
+    # Índices por categoria, disponibilidade e rating para os filtros de /books
+    filter_index: FilterIndex
+
+    # JSON de cada livro (fatias do catálogo completo) e do catálogo completo
+    book_rows_json: Sequence[bytes]
+    books_json: bytes
+
+    # Agregados por categoria
+    categories_summary: List[dict]  # [{"name", "count"}] em ordem alfabética
+    catalog_stats: StatsResponse
+
+    # Versão do dataset: hash do payload serializado, muda só quando os dados mudam
+    dataset_version: str
+
+    # Corpos de PAYLOADS e as variantes gzip/brotli deles, por (nome,
+    # codificação). Lido do binário, já vem com as variantes gravadas nele;
+    # services completa o resto antes de publicar o snapshot
+    payloads: Dict[Tuple[str, Optional[str]], bytes] = field(default_factory=dict)
+
+    # CSV de origem e assinatura dele e do binário que o acompanha na leitura
+    source_path: Optional[str] = None
+    source_signature: Optional[tuple] = None
+    source_format: str = 'csv'  # 'csv', 'binary' ou 'mmap'
+    loaded_at: float = 0.0
+    load_seconds: float = 0.0  # Duração da carga (leitura + índices)
+    last_modified: float = 0.0  # Quando os dados mudaram (header Last-Modified)
+
+
+def file_signature(filepath: str) -> Tuple[int, int, int]:
+    """Identifica a versão de um arquivo no disco por (mtime_ns, inode, tamanho)"""
+    info = os.stat(filepath)
+    return info.st_mtime_ns, info.st_ino, info.st_size
+
+
+def source_signature(csv_path: str) -> tuple:
+    """Assinatura do CSV e do binário que o acompanha (None para o que não existir)"""
+    signatures = []
+    for path in (csv_path, binary_path_for(csv_path)):
+        try:
+            signatures.append(file_signature(path))
+        except OSError:
+            signatures.append(None)
+    return tuple(signatures)
+
+
+def read_books_csv(filepath: str) -> List[dict]:
+    """Lê o CSV de livros e converte os tipos de cada linha"""
+    # Lê o CSV usando biblioteca csv nativa
+    with open(filepath, 'r', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        books_data = list(reader)
+
+    # Adiciona ID sequencial e converte tipos
+    for i, book in enumerate(books_data, start=1):
+        book['id'] = i
+        try:
+            book['price'] = float(book['price'])
+        except (ValueError, KeyError):
+            book['price'] = 0.0
+
+        try:
+            book['rating'] = int(book['rating'])
+        except (ValueError, KeyError):
+            book['rating'] = 0
+
+        # Garante que category existe (retrocompatibilidade com CSV antigo)
+        if 'category' not in book or not book.get('category', '').strip():
+            book['category'] = 'Unknown'
+
+    return books_data
+
+
+def load_snapshot_from_csv(filepath: str, use_mmap: bool = False) -> CatalogSnapshot:
+    """Monta um snapshot completo a partir do CSV (sem publicá-lo)
+
+    Se existir o binário gerado deste mesmo CSV (books.csv -> books.bin),
+    ele é usado no lugar do CSV, evitando o parse linha a linha. Com
+    use_mmap=True o binário é mapeado em memória e usado sem cópia.
+    """
+    start = time.perf_counter()
+    snapshot = _load_snapshot(filepath, use_mmap)
+    return replace(
+        snapshot,
+        load_seconds=time.perf_counter() - start,
+        last_modified=_source_mtime(snapshot),
+    )
+
+
+def _source_mtime(snapshot: CatalogSnapshot) -> float:
+    """mtime do CSV lido na carga (igual em todos os workers), ou a hora da carga"""
+    csv_signature = snapshot.source_signature[0] if snapshot.source_signature else None
+    if csv_signature is None:
+        return snapshot.loaded_at
+    return csv_signature[0] / 1e9
+
+
+def _load_snapshot(filepath: str, use_mmap: bool) -> CatalogSnapshot:
+    """Escolhe a origem (binário mapeado, binário ou CSV) e monta o snapshot"""
+    # Assinatura lida antes do conteúdo: se o arquivo mudar durante a leitura,
+    # a próxima verificação vê a diferença e recarrega de novo
+    signature = source_signature(filepath)
+
+    binary = load_fresh_binary_catalog(filepath, use_mmap=use_mmap)
+    if binary is not None:
+        return build_mapped_snapshot(
+            binary, source_path=filepath, source_signature=signature,
+            source_format='mmap' if use_mmap else 'binary',
+        )
+
+    books_data = read_books_csv(filepath)
+    return build_snapshot(books_data, source_path=filepath, source_signature=signature)
+
+
+def write_binary_snapshot(csv_path: str, binary_path: Optional[str] = None) -> str:
+    """Gera o arquivo binário do catálogo a partir do CSV e retorna o caminho dele
+
+    As variantes comprimidas de PAYLOADS são geradas aqui, nos níveis
+    máximos, e vão no arquivo: a API não precisa comprimir nada na carga.
+    """
+    binary_path = binary_path or binary_path_for(csv_path)
+    fingerprint = csv_fingerprint(csv_path)
+    snapshot = build_snapshot(read_books_csv(csv_path))
+    snapshot = replace(snapshot, payloads=precompress(payload_bodies(snapshot)))
+    write_binary_catalog(binary_path, snapshot, fingerprint)
+    return binary_path
+
+
+def build_mapped_snapshot(
+    catalog: BinaryCatalog,
+    source_path: Optional[str] = None,
+    source_signature: Optional[tuple] = None,
+    source_format: str = 'mmap',
+) -> CatalogSnapshot:
+    """Monta um snapshot que lê tudo direto das seções do catálogo binário
+
+    Colunas, índices e o JSON de cada livro são visões sobre o buffer, sem
+    parse nem validação. Com o arquivo mapeado (source_format='mmap'),
+    vários workers que mapeiam o mesmo arquivo dividem as mesmas páginas;
+    lido para a memória ('binary'), o buffer é do processo.
+    Linhas e objetos Book são criados sob demanda, sem cache por processo.
+    """
+    sections = catalog.sections
+    category_names = catalog.category_names()
+    availability_names = catalog.availability_names()
+    books_data = MappedRows(catalog, category_names, availability_names)
+
+    # O payload completo também é uma fatia do arquivo
+    books_json = catalog.json
+    dataset_version = hashlib.sha256(books_json).hexdigest()[:16]
+
+    categories_summary, catalog_stats = build_category_stats(
+        category_names, sections['category_codes'],
+        sections['prices'], sections['ratings'], dataset_version,
+    )
+
+    titles_lower = catalog.titles_lower()
+
+    return CatalogSnapshot(
+        books_data=books_data,
+        books_by_id=MappedBooks(books_data),
+        titles_lower=titles_lower,
+        title_trigrams=catalog.trigram_index(),
+        text_index=catalog.text_index(titles_lower),
+        prices=sections['prices'],
+        ratings=sections['ratings'],
+        category_codes=sections['category_codes'],
+        category_names=category_names,
+        availability_codes=sections['availability_codes'],
+        availability_names=availability_names,
+        price_order=sections['price_order'],
+        price_keys=sections['price_keys'],
+        rating_order=sections['rating_order'],
+        rating_keys=sections['rating_keys'],
+        title_order=sections['title_order'],
+        filter_index=build_filter_index(
+            sections['category_codes'], sections['availability_codes'], sections['ratings'],
+            sections['prices'], sections['price_order'], sections['price_keys'],
+            indexes=catalog.filter_indexes(),
+        ),
+        book_rows_json=catalog.book_rows_json(),
+        books_json=books_json,
+        categories_summary=categories_summary,
+        catalog_stats=catalog_stats,
+        dataset_version=dataset_version,
+        source_path=source_path,
+        source_signature=source_signature,
+        payloads=catalog.payloads(),
+        source_format=source_format,
+        loaded_at=time.time(),
+    )
+
+
+def build_snapshot(
+    books_data: Sequence[dict],
+    source_path: Optional[str] = None,
+    source_signature: Optional[tuple] = None,
+) -> CatalogSnapshot:
+    """Valida os livros e monta todos os índices e payloads derivados"""
+    columns = build_numeric_columns(books_data)
+
+    # Valida cada livro uma única vez; o Book só é usado para gerar o JSON,
+    # depois os campos de texto vão para as colunas compactas de BookRows
+    titles, availability, image_urls = [], [], []
+    book_rows_json = []
+    for book in books_data:
+        model = Book(**book)
+        titles.append(model.title)
+        availability.append(model.availability)
+        image_urls.append(model.image_url)
+        # Usa o Book validado para manter o mesmo formato do response_model
+        book_rows_json.append(dump_json(model.model_dump()))
+
+    titles_lower = [title.lower() for title in titles]
+    title_trigrams = build_trigram_index(titles_lower)
+
+    # O JSON de cada livro passa a ser uma fatia do payload completo
+    books_json = join_json_array(book_rows_json)
+    json_offsets = array('Q', [1])
+    for row in book_rows_json:
+        json_offsets.append(json_offsets[-1] + len(row) + 1)
+    book_rows_json = JsonRows(memoryview(books_json), json_offsets)
+    dataset_version = hashlib.sha256(books_json).hexdigest()[:16]
+
+    availability_codes, availability_names = encode_values(availability)
+    rows = BookRows(
+        titles, image_urls, columns['prices'], columns['ratings'],
+        columns['category_codes'], columns['category_names'], availability_codes, availability_names,
+    )
+
+    categories_summary, catalog_stats = build_category_stats(
+        columns['category_names'], columns['category_codes'],
+        columns['prices'], columns['ratings'], dataset_version,
+    )
+
+    return CatalogSnapshot(
+        books_data=rows,
+        books_by_id=MappedBooks(rows),
+        titles_lower=titles_lower,
+        title_trigrams=title_trigrams,
+        text_index=build_text_index(titles_lower),
+        title_order=build_title_order(titles_lower, columns['ratings']),
+        availability_codes=availability_codes,
+        availability_names=availability_names,
+        filter_index=build_filter_index(
+            columns['category_codes'], availability_codes, columns['ratings'],
+            columns['prices'], columns['price_order'], columns['price_keys'],
+        ),
+        book_rows_json=book_rows_json,
+        books_json=books_json,
+        categories_summary=categories_summary,
+        catalog_stats=catalog_stats,
+        dataset_version=dataset_version,
+        source_path=source_path,
+        source_signature=source_signature,
+        loaded_at=time.time(),
+        **columns,
+    )
+
+
+def build_numeric_columns(books_data: Sequence[dict]) -> dict:
+    """Monta as colunas de preço, rating e categoria e as ordenações para busca por faixa"""
+    prices = array('d', (book['price'] for book in books_data))
+    ratings = array('i', (book['rating'] for book in books_data))
+
+    # Categoria codificada como inteiro (índice em category_names)
+    category_names = sorted({book['category'] for book in books_data})
+    code_of = {name: code for code, name in enumerate(category_names)}
+    category_codes = array('I', (code_of[book['category']] for book in books_data))
+
+    positions = range(len(books_data))
+    price_order = array('I', sorted(positions, key=lambda i: prices[i]))
+    rating_order = array('I', sorted(positions, key=lambda i: -ratings[i]))
+
+    return {
+        'prices': prices,
+        'ratings': ratings,
+        'category_codes': category_codes,
+        'category_names': category_names,
+        'price_order': price_order,
+        'price_keys': array('d', (prices[i] for i in price_order)),
+        'rating_order': rating_order,
+        'rating_keys': array('i', (-ratings[i] for i in rating_order)),
+    }
+
+
+def build_filter_index(
+    category_codes: array,
+    availability_codes: array,
+    ratings: array,
+    prices: array,
+    price_order: array,
+    price_keys: array,
+    indexes: Optional[Dict[str, ValueIndex]] = None,
+) -> FilterIndex:
+    """Monta os índices por valor das colunas filtráveis de /api/v1/books
+
+    `indexes` permite usar índices já prontos (ex: lidos do catálogo binário).
+    """
+    columns = {'category': category_codes, 'availability': availability_codes, 'rating': ratings}
+    if indexes is None:
+        indexes = {name: build_value_index(column) for name, column in columns.items()}
+    return FilterIndex(columns, indexes, prices, price_order, price_keys)
+
+
+def build_category_stats(
+    category_names: List[str],
+    category_codes: array,
+    prices: array,
+    ratings: array,
+    dataset_version: str,
+) -> Tuple[List[dict], StatsResponse]:
+    """Calcula contagem, faixa de preço e médias por categoria a partir das colunas"""
+    count = [0] * len(category_names)
+    price_sum = [0.0] * len(category_names)
+    rating_sum = [0] * len(category_names)
+    min_price = [float('inf')] * len(category_names)
+    max_price = [float('-inf')] * len(category_names)
+
+    for code, price, rating in zip(category_codes, prices, ratings):
+        count[code] += 1
+        price_sum[code] += price
+        rating_sum[code] += rating
+        if price < min_price[code]:
+            min_price[code] = price
+        if price > max_price[code]:
+            max_price[code] = price
+
+    # category_names já está em ordem alfabética
+    categories = [
+        CategoryStats(
+            name=name,
+            count=count[code],
+            min_price=min_price[code],
+            max_price=max_price[code],
+            avg_price=round(price_sum[code] / count[code], 2),
+            avg_rating=round(rating_sum[code] / count[code], 2),
+        )
+        for code, name in enumerate(category_names)
+    ]
+    categories_summary = [{"name": c.name, "count": c.count} for c in categories]
+
+    total = len(prices)
+    catalog_stats = StatsResponse(
+        dataset_version=dataset_version,
+        total_books=total,
+        total_categories=len(categories),
+        avg_price=round(sum(prices) / total, 2) if total else 0.0,
+        avg_rating=round(sum(ratings) / total, 2) if total else 0.0,
+        categories=categories,
+    )
+    return categories_summary, catalog_stats
+
+
+def dump_json(value) -> bytes:
+    """Serializa no mesmo formato de JSON usado pelo FastAPI (compacto, UTF-8)
+
+    Com o orjson instalado a serialização é ~8x mais rápida; a saída é a
+    mesma, exceto a notação de expoente de floats extremos (1e16 x 1e+16).
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def join_json_array(rows: List[bytes]) -> bytes:
+    """Junta objetos JSON já serializados em um array JSON"""
+    return b'[' + b','.join(rows) + b']'
+
+
+# Corpos servidos inteiros (?all=true, /categories e /stats), montados a
+# partir do snapshot; as variantes comprimidas deles ficam em snapshot.payloads
+PAYLOADS = {
+    'books': lambda snapshot: snapshot.books_json,
+    'categories': lambda snapshot: dump_json(snapshot.categories_summary),
+    'stats': lambda snapshot: dump_json(snapshot.catalog_stats.model_dump()),
+}
+
+
+def payload_bodies(snapshot: CatalogSnapshot) -> Dict[str, bytes]:
+    """Forma original (sem compressão) de cada corpo de PAYLOADS"""
+    return {name: build(snapshot) for name, build in PAYLOADS.items()}
@@ -0,0 +1,71 @@
+import gzip
+from typing import Dict, Optional, Tuple
+
+# brotli é opcional: sem ele, as variantes pré-comprimidas são só gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Codificações das variantes pré-comprimidas, da preferida para a menos preferida
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Níveis máximos: usados quando as variantes são geradas fora da API
+# (scripts/build_snapshot.py grava no books.bin) ou em segundo plano
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Níveis rápidos: usados na carga, antes da troca do snapshot, e em corpos
+# maiores que LARGE_PAYLOAD_SIZE (gzip-9 é ~1,6x mais lento que gzip-6 e fica
+# só ~3% menor; brotli-11 é dezenas de vezes mais lento que brotli-5)
+LARGE_PAYLOAD_SIZE = 1 << 20
+FAST_GZIP_LEVEL = 6
+FAST_BROTLI_QUALITY = 5
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Escolhe a codificação pelo header Accept-Encoding (None = sem compressão)
+
+    Respeita os pesos q (q=0 recusa a codificação); em empate vale a ordem
+    de ENCODINGS, com brotli antes de gzip.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data: bytes, encoding: str, fast: bool = False) -> bytes:
+    """Comprime o corpo na codificação pedida ('br' ou 'gzip')
+
+    Com `fast` (ou corpo maior que LARGE_PAYLOAD_SIZE), usa os níveis rápidos.
+    """
+    fast = fast or len(data) > LARGE_PAYLOAD_SIZE
+    if encoding == 'br':
+        return brotli.compress(data, quality=FAST_BROTLI_QUALITY if fast else BROTLI_QUALITY)
+    # mtime=0: a mesma entrada gera sempre os mesmos bytes (em qualquer worker)
+    return gzip.compress(data, compresslevel=FAST_GZIP_LEVEL if fast else GZIP_LEVEL, mtime=0)
+
+
+def precompress(bodies: Dict[str, bytes], fast: bool = False) -> Dict[Tuple[str, str], bytes]:
+    """Cada corpo comprimido em todas as ENCODINGS, por (nome, codificação)"""
+    return {
+        (name, encoding): compress(body, encoding, fast)
+        for name, body in bodies.items() for encoding in ENCODINGS
+    }
@@ -0,0 +1,168 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from api.rows import column_nbytes
+
+# A faixa de preço só gera os candidatos se for bem menor que o outro conjunto:
+# as posições dela precisam ser ordenadas por id, e os índices (e a lista
+# inteira) já estão em ordem e podem parar assim que a página enche
+PRICE_SORT_COST = 4
+
+# Maior faixa de preço que pode gerar os candidatos: as posições dela são
+# reordenadas por id a cada página. Faixas maiores cobrem livros o bastante
+# para a varredura por id (com o preço checado em cada posição) encher a página logo
+PRICE_SORT_LIMIT = 4096
+
+# Colunas com índice por valor (códigos de categoria e disponibilidade, rating)
+FILTER_COLUMNS = ('category', 'availability', 'rating')
+
+# Posições de um valor que nenhum livro tem
+_EMPTY = array('I')
+
+
+@dataclass(frozen=True)
+class ValueIndex:
+    """Índice valor -> posições dos livros com esse valor, em arrays planos
+
+    As posições do valor values[i] são positions[offsets[i]:offsets[i + 1]],
+    em ordem crescente. Os mesmos arrays são gravados no catálogo binário e
+    lidos de lá.
+    """
+    values: Sequence[int]  # Em ordem crescente
+    offsets: Sequence[int]
+    positions: Sequence[int]
+
+    def get(self, value: int, default=None) -> Optional[Sequence[int]]:
+        """Posições dos livros com o valor (fatia sem cópia), ou `default`"""
+        i = bisect_left(self.values, value)
+        if i == len(self.values) or self.values[i] != value:
+            return default
+        return memoryview(self.positions)[self.offsets[i]:self.offsets[i + 1]]
+
+    def memory_usage(self) -> dict:
+        """Bytes ocupados pelos arrays"""
+        return {'value_index': sum(column_nbytes(column) for column in (self.values, self.offsets, self.positions))}
+
+
+def build_value_index(column: Sequence[int]) -> ValueIndex:
+    """Monta o índice valor -> posições dos livros com esse valor (em ordem crescente)"""
+    index: Dict[int, List[int]] = {}
+    for position, value in enumerate(column):
+        index.setdefault(value, []).append(position)
+
+    values = array('i', sorted(index))
+    offsets = array('I', [0])
+    positions = array('I')
+    for value in values:
+        positions.extend(index[value])
+        offsets.append(len(positions))
+    return ValueIndex(values, offsets, positions)
+
+
+@dataclass(frozen=True)
+class FilterPlan:
+    """Como uma combinação de filtros vai ser executada
+
+    `candidates` são as posições (crescentes) do filtro mais seletivo; cada
+    candidato ainda precisa passar por `checks` (coluna, valor) e, se
+    `check_price` for True, pela faixa de preço.
+    """
+    candidates: Sequence[int]
+    checks: Tuple[Tuple[Sequence[int], int], ...]
+    check_price: bool
+    min_price: float
+    max_price: float
+
+
+class FilterIndex:
+    """Índices por valor de categoria, disponibilidade e rating, com o planejador dos filtros
+
+    Cada valor tem a lista ordenada das posições dos livros que o têm. Para
+    combinar filtros, o planejador começa pelo conjunto menor (um desses
+    índices ou a faixa de preço, achada por busca binária em price_keys) e
+    confere os demais filtros direto nas colunas, um acesso por candidato.
+    Isso é a interseção com os outros índices sem montar nenhum conjunto, e
+    os resultados saem em ordem de id, como nas outras listagens.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, Sequence[int]],
+        indexes: Dict[str, ValueIndex],
+        prices: Sequence[float],
+        price_order: Sequence[int],
+        price_keys: Sequence[float],
+    ):
+        # Colunas guardam códigos inteiros: índice em category_names/availability_names, ou o rating
+        self._columns = columns
+        self._indexes = indexes
+        self._prices = prices
+        self._price_order = price_order
+        self._price_keys = price_keys
+
+    def value_index(self, name: str) -> ValueIndex:
+        """Índice por valor da coluna `name` (uma de FILTER_COLUMNS)"""
+        return self._indexes[name]
+
+    def memory_usage(self) -> dict:
+        """Bytes ocupados pelos índices (as colunas contam no snapshot)"""
+        return {
+            'filter_index': sum(sum(index.memory_usage().values()) for index in self._indexes.values()),
+        }
+
+    def count(self, name: str, value: int) -> int:
+        """Quantos livros têm `value` na coluna `name`"""
+        return len(self._indexes[name].get(value, _EMPTY))
+
+    def plan(
+        self,
+        equals: Dict[str, int],
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> FilterPlan:
+        """Escolhe o filtro mais seletivo para gerar os candidatos
+
+        `equals` tem os filtros de igualdade (coluna -> código do valor).
+        """
+        low = float('-inf') if min_price is None else min_price
+        high = float('inf') if max_price is None else max_price
+        has_price = min_price is not None or max_price is not None
+
+        # (tamanho, nome) de cada conjunto que pode gerar os candidatos
+        options = sorted((self.count(name, value), name) for name, value in equals.items())
+        if has_price:
+            lo = bisect_left(self._price_keys, low)
+            hi = bisect_right(self._price_keys, high)
+            smallest = options[0][0] if options else len(self._prices)
+            if hi - lo <= PRICE_SORT_LIMIT and (hi - lo) * PRICE_SORT_COST < smallest:
+                # A faixa de preço é a mais seletiva: as posições vêm de
+                # price_order (em ordem de preço) e são reordenadas por id
+                candidates = array('I', sorted(self._price_order[lo:hi]))
+                checks = tuple((self._columns[name], value) for name, value in equals.items())
+                return FilterPlan(candidates, checks, False, low, high)
+
+        if not options:
+            return FilterPlan(range(len(self._prices)), (), has_price, low, high)
+
+        driver = options[0][1]
+        checks = tuple((self._columns[name], equals[name]) for _, name in options[1:])
+        return FilterPlan(self._indexes[driver].get(equals[driver], _EMPTY), checks, has_price, low, high)
+
+    def iter_positions(self, plan: FilterPlan, start: int = 0) -> Iterator[int]:
+        """Gera, em ordem, as posições >= start que passam por todos os filtros do plano"""
+        candidates = plan.candidates
+        first = bisect_left(candidates, start)
+        checks = plan.checks
+        prices, low, high = self._prices, plan.min_price, plan.max_price
+        # A fatia (de memoryview, array ou range) pula direto para `first`
+        for position in candidates[first:]:
+            if plan.check_price and not low <= prices[position] <= high:
+                continue
+            if all(column[position] == value for column, value in checks):
+                yield position
+
+    def find(self, plan: FilterPlan, start: int = 0, limit: Optional[int] = None) -> List[int]:
+        """Posições (em ordem) que passam pelos filtros, a partir de start, até `limit`"""
+        return list(islice(self.iter_positions(plan, start), limit))
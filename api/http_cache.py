@@ -0,0 +1,167 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+from api.compression import ENCODINGS
+
+# Leitura que não é do catálogo (health, admin, docs): nunca guardar em cache
+NO_STORE = "no-store"
+
+
+# Codificações que uma resposta pode ter (gzip também vem do GZipMiddleware)
+CONTENT_ENCODINGS = tuple(dict.fromkeys(ENCODINGS + ('gzip',)))
+
+
+def format_etag(dataset_version: str, encoding: Optional[str] = None) -> str:
+    """ETag forte: o corpo de cada URL só muda quando muda a versão do dataset
+
+    Cada codificação (gzip, br) tem bytes diferentes, então ganha um sufixo.
+    """
+    if encoding:
+        return f'"{dataset_version}-{encoding}"'
+    return f'"{dataset_version}"'
+
+
+def etag_matches(if_none_match: str, etags: Iterable[str]) -> Optional[str]:
+    """Procura no If-None-Match uma das ETags atuais (comparação fraca, como manda o RFC 9110)
+
+    Retorna a ETag encontrada. `*` não é tratado aqui: para GET ele só vale
+    se o recurso existir, e isso quem decide é a rota.
+    """
+    targets = set(etags)
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip().removeprefix('W/')
+        if candidate in targets:
+            return candidate
+    return None
+
+
+def not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    """True se os dados não mudaram depois da data do If-Modified-Since"""
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # A data HTTP tem resolução de segundos
+    return int(last_modified) <= since.timestamp()
+
+
+class HttpCacheMiddleware:
+    """Middleware ASGI de cache HTTP condicional para as leituras do catálogo
+
+    Nas rotas de `paths`, respostas 200 saem com ETag (versão do dataset e
+    codificação), Last-Modified, Cache-Control e Vary: Accept-Encoding. Um GET com If-None-Match (ou, sem ele,
+    If-Modified-Since) que ainda vale recebe 304 vazio no lugar do 200. A
+    rota roda normalmente, então um ID inexistente ou um cursor inválido
+    continuam respondendo 404/400. As demais leituras saem com
+    Cache-Control: no-store.
+
+    `validators` retorna (dataset_version, last_modified) do snapshot publicado.
+    """
+
+    def __init__(self, app, validators: Callable[[], Tuple[str, float]], cache_control: str,
+                 paths: Tuple[str, ...]):
+        self.app = app
+        self.validators = validators
+        self.cache_control = cache_control.encode('latin-1')
+        self.paths = paths
+        self._headers_version = None
+        self._headers: List[Tuple[bytes, bytes]] = []
+
+    def _cache_headers(self, dataset_version: str, last_modified: float) -> List[Tuple[bytes, bytes]]:
+        """Headers de cache da versão atual (só são formatados de novo quando ela muda)"""
+        if self._headers_version != (dataset_version, last_modified):
+            self._headers = [
+                (b'last-modified', formatdate(last_modified, usegmt=True).encode('latin-1')),
+                (b'cache-control', self.cache_control),
+                (b'vary', b'Accept-Encoding'),
+                (b'x-dataset-version', dataset_version.encode('latin-1')),
+            ]
+            self._headers_version = (dataset_version, last_modified)
+        return self._headers
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            await self.app(scope, receive, send)
+            return
+
+        if not scope['path'].startswith(self.paths):
+            await self.app(scope, receive, _with_default_header(send, b'cache-control', NO_STORE.encode()))
+            return
+
+        # Versão lida antes de a rota montar o corpo: se uma recarga acontecer no
+        # meio, o corpo novo sai com a ETag antiga e o próximo GET condicional
+        # baixa de novo (o contrário deixaria o cliente preso a um corpo velho)
+        dataset_version, last_modified = self.validators()
+        headers = self._cache_headers(dataset_version, last_modified)
+
+        etag = self._fresh_etag(scope, dataset_version, last_modified)
+        not_modified = False
+
+        async def send_wrapper(message):
+            nonlocal not_modified
+            if message['type'] == 'http.response.start' and message['status'] == 200 and etag is not None:
+                # Cópia do cliente ainda vale: só o 200 vira 304, erros da rota passam
+                not_modified = True
+                message = {
+                    'type': 'http.response.start',
+                    'status': 304,
+                    'headers': headers + [(b'etag', etag.encode('latin-1'))],
+                }
+            elif message['type'] == 'http.response.body' and not_modified:
+                # Descarta o corpo; o 304 termina na última parte
+                if message.get('more_body', False):
+                    return
+                message = {'type': 'http.response.body', 'body': b''}
+            elif message['type'] == 'http.response.start' and message['status'] == 200:
+                response_headers = message.get('headers', [])
+                encoding = None
+                for name, value in response_headers:
+                    if name == b'content-encoding':
+                        encoding = value.decode('latin-1')
+                etag_header = (b'etag', format_etag(dataset_version, encoding).encode('latin-1'))
+                names = {name for name, _ in headers}
+                message = {
+                    **message,
+                    'headers': [item for item in response_headers if item[0] not in names]
+                    + headers + [etag_header],
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _fresh_etag(scope, dataset_version: str, last_modified: float) -> Optional[str]:
+        """ETag da cópia do cliente, se ela ainda vale (None se não vale)
+
+        If-None-Match tem prioridade sobre If-Modified-Since. Qualquer
+        codificação da versão atual vale: o 304 só confirma a cópia que o
+        cliente já tem.
+        """
+        if_none_match: Optional[bytes] = None
+        if_modified_since: Optional[bytes] = None
+        for name, value in scope['headers']:
+            if name == b'if-none-match':
+                if_none_match = value
+            elif name == b'if-modified-since':
+                if_modified_since = value
+        if if_none_match is not None:
+            etags = [format_etag(dataset_version)]
+            etags += [format_etag(dataset_version, encoding) for encoding in CONTENT_ENCODINGS]
+            return etag_matches(if_none_match.decode('latin-1'), etags)
+        if if_modified_since is not None and not_modified_since(if_modified_since.decode('latin-1'), last_modified):
+            return format_etag(dataset_version)
+        return None
+
+
+def _with_default_header(send, name: bytes, value: bytes):
+    """Envolve `send` para incluir o header na resposta, se a rota não o definiu"""
+    async def send_wrapper(message):
+        if message['type'] == 'http.response.start':
+            headers = list(message.get('headers', []))
+            if all(header != name for header, _ in headers):
+                headers.append((name, value))
+                message = {**message, 'headers': headers}
+        await send(message)
+
+    return send_wrapper
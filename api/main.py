@@ -1,7 +1,57 @@
-from fastapi import FastAPI, HTTPException
+import hmac
+import os
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from typing import List, Optional
-from api.models import Book, HealthResponse
-from api.services import load_books_from_csv, get_all_books, get_book_by_id, search_books
+from api.compression import choose_encoding
+from api.http_cache import HttpCacheMiddleware
+from api.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, render_metrics
+from api.models import (
+    Book, BookSuggestion, HealthResponse, MemoryReport, ProfileReport, ProfileSummary, ReloadResponse, StatsResponse,
+)
+from api.profiling import (
+    ProfilingMiddleware, ProfilingRoute, get_profile, get_profile_text, list_profiles,
+)
+from api.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor, decode_keyset_cursor,
+)
+from api.services import (
+    load_books_from_csv, get_payload, get_books_page_json, filter_books_json, filter_books_page_json,
+    get_dataset_version, get_book_json, search_books_json, search_books_page_json, iter_books_ndjson,
+    rank_books_json, rank_books_page_json, autocomplete_json,
+    get_books_by_price_range_json, get_top_rated_books_json,
+    get_total_books, get_memory_report, get_snapshot, reload_books_if_changed, start_reload_watcher, stop_reload_watcher,
+)
+
+# Caminho do CSV e intervalo (segundos) para recarregar quando o arquivo mudar.
+# Com BOOKS_RELOAD_INTERVAL=0 (padrão) a recarga automática fica desligada
+BOOKS_CSV_PATH = os.getenv("BOOKS_CSV_PATH", "data/books.csv")
+BOOKS_RELOAD_INTERVAL = float(os.getenv("BOOKS_RELOAD_INTERVAL", "0"))
+
+# Com BOOKS_MMAP=1 o catálogo binário (books.bin) é mapeado em memória somente
+# leitura, e todos os workers do uvicorn compartilham as mesmas páginas
+BOOKS_MMAP = os.getenv("BOOKS_MMAP", "0").lower() in ("1", "true", "yes")
+
+# Token exigido no header X-Admin-Token dos endpoints de admin.
+# Sem ADMIN_TOKEN definido, os endpoints de admin ficam desabilitados
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Com BOOKS_PROFILING=1, requisições com o header X-Profile: 1 (e o token de
+# admin, se ADMIN_TOKEN estiver definido) rodam dentro do cProfile. Desligado,
+# nada é instalado e as requisições não pagam nenhum custo extra
+BOOKS_PROFILING = os.getenv("BOOKS_PROFILING", "0").lower() in ("1", "true", "yes")
+
+# Por quantos segundos clientes e CDN podem reusar uma resposta sem revalidar.
+# Com 0 (padrão) toda requisição revalida, e o que não mudou volta como 304 vazio
+BOOKS_CACHE_MAX_AGE = int(os.getenv("BOOKS_CACHE_MAX_AGE", "0"))
+
+# Leituras do catálogo com ETag/Last-Modified (o resto das leituras sai com no-store)
+CACHEABLE_PATHS = ("/api/v1/books", "/api/v1/categories", "/api/v1/stats")
+
+# Corpos gerados por requisição (páginas, buscas) menores que isso saem sem
+# compressão: em respostas pequenas o gzip custa mais CPU do que economiza rede
+BOOKS_COMPRESSION_MIN_SIZE = int(os.getenv("BOOKS_COMPRESSION_MIN_SIZE", "1024"))
 
 # Cria a aplicação FastAPI
 app = FastAPI(
@@ -10,6 +60,34 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# gzip por requisição só para corpos que não têm variante pré-comprimida
+# (os que já saem com Content-Encoding passam direto)
+app.add_middleware(GZipMiddleware, minimum_size=BOOKS_COMPRESSION_MIN_SIZE, compresslevel=6)
+
+
+def _cache_validators():
+    """Versão e data de modificação do catálogo publicado (calculadas na carga)"""
+    snapshot = get_snapshot()
+    return snapshot.dataset_version, snapshot.last_modified
+
+
+# GETs condicionais ainda válidos recebem 304 no lugar do 200 da rota. Fica
+# por dentro do middleware de métricas, que assim também conta os 304
+app.add_middleware(
+    HttpCacheMiddleware,
+    validators=_cache_validators,
+    cache_control=f"public, max-age={BOOKS_CACHE_MAX_AGE}, must-revalidate",
+    paths=CACHEABLE_PATHS,
+)
+
+# Latência, tamanho e status de cada requisição, expostos em /metrics
+app.add_middleware(MetricsMiddleware, registry=REGISTRY)
+
+if BOOKS_PROFILING:
+    # Precisa vir antes das rotas: cada rota é criada com a route_class do router
+    app.router.route_class = ProfilingRoute
+    app.add_middleware(ProfilingMiddleware, admin_token=ADMIN_TOKEN)
+
 
 @app.on_event("startup")
 def startup_event():
@@ -18,7 +96,9 @@ def startup_event():
     print("🚀 Iniciando Books API...")
     print("=" * 50)
     try:
-        load_books_from_csv()
+        load_books_from_csv(BOOKS_CSV_PATH, use_mmap=BOOKS_MMAP)
+        if BOOKS_RELOAD_INTERVAL > 0:
+            start_reload_watcher(BOOKS_RELOAD_INTERVAL)
         print("✅ API pronta!")
         print("📊 Acesse /docs para documentação Swagger")
     except Exception as e:
@@ -28,6 +108,84 @@ def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+def shutdown_event():
+    """Executado quando a API encerra"""
+    stop_reload_watcher()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Confere o token de admin enviado no header X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoints de admin desabilitados (defina ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de admin inválido")
+
+
+def require_profiling(x_admin_token: Optional[str] = Header(None)):
+    """Acesso aos perfis: exige BOOKS_PROFILING=1 e, se ADMIN_TOKEN existir, o token"""
+    if not BOOKS_PROFILING:
+        raise HTTPException(status_code=404, detail="Profiling desabilitado (defina BOOKS_PROFILING=1)")
+    if ADMIN_TOKEN:
+        require_admin(x_admin_token)
+
+
+def _read_cursor(cursor: Optional[str]) -> int:
+    """Decodifica o cursor da query string, respondendo 400 se for inválido"""
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _read_keyset_cursor(cursor: Optional[str]):
+    """Decodifica um cursor ordenado por chave, respondendo 400 se for inválido"""
+    try:
+        return decode_keyset_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _json_response(content) -> Response:
+    """Resposta com o JSON dos livros gerado na carga do catálogo
+
+    Os livros já foram validados pelo modelo Book uma vez, na carga; devolver
+    o Response direto evita criar objetos Book e validar/serializar de novo
+    pelo response_model, que continua na rota só para o schema do OpenAPI.
+    """
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={"X-Dataset-Version": get_dataset_version()},
+    )
+
+
+def _payload_response(name: str, request: Request) -> Response:
+    """Resposta com um corpo pré-calculado, na variante pedida pelo Accept-Encoding
+
+    As variantes gzip/brotli ficam prontas antes da troca do snapshot.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    response = _json_response(get_payload(name, encoding))
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def _set_next_cursor(response: Response, last_id: Optional[int], key=None):
+    """Coloca o cursor da próxima página no header X-Next-Cursor (se houver)"""
+    if last_id is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(last_id, key)
+
+
+def _set_next_keyset_cursor(response: Response, last):
+    """Igual a _set_next_cursor, para páginas ordenadas por (chave, id)"""
+    if last is not None:
+        key, last_id = last
+        _set_next_cursor(response, last_id, key)
+
+
 # ========== ENDPOINTS ==========
 
 @app.get("/")
@@ -39,59 +197,269 @@ def root():
 @app.get("/api/v1/health", response_model=HealthResponse)
 def health_check():
     """Verifica se a API está funcionando"""
-    books = get_all_books()
     return {
         "status": "ok",
-        "total_books": len(books)
+        "total_books": get_total_books()
     }
 
 
 @app.get("/api/v1/books", response_model=List[Book])
-def list_books():
-    """Lista todos os livros disponíveis"""
-    return get_all_books()
+def list_books(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    all_books: bool = Query(False, alias="all"),
+    category: Optional[str] = None,
+    availability: Optional[str] = None,
+    rating: Optional[int] = Query(None, ge=0, le=5),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+):
+    """Lista os livros disponíveis, paginados por cursor
+
+    O cursor da próxima página vem no header X-Next-Cursor.
+    Use ?all=true para receber o catálogo completo de uma vez.
+
+    Filtros combináveis: category, availability e rating (valor exato) e
+    faixa de preço (min_price/max_price).
+    Exemplo: /api/v1/books?category=Travel&rating=5&max_price=30
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="O preço mínimo não pode ser maior que o máximo")
+
+    filters = {
+        name: value for name, value in (
+            ("category", category), ("availability", availability), ("rating", rating),
+            ("min_price", min_price), ("max_price", max_price),
+        ) if value is not None
+    }
+    if filters:
+        # Planejado pelos índices de api/filters.py: começa pelo filtro mais seletivo
+        if all_books:
+            return _json_response(filter_books_json(**filters))
+        content, last_id = filter_books_page_json(_read_cursor(cursor), limit, **filters)
+        response = _json_response(content)
+        _set_next_cursor(response, last_id)
+        return response
+
+    # O JSON é montado uma vez na carga do CSV e devolvido direto,
+    # sem criar objetos Book nem validar de novo a cada requisição
+    if all_books:
+        return _payload_response("books", request)
+
+    content, last_id = get_books_page_json(_read_cursor(cursor), limit)
+    response = _json_response(content)
+    _set_next_cursor(response, last_id)
+    return response
 
 
 @app.get("/api/v1/books/search", response_model=List[Book])
-def search(title: Optional[str] = None):
-    """Busca livros por título
+def search(
+    title: Optional[str] = None,
+    q: Optional[str] = None,
+    min_score: float = Query(0.0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    all_results: bool = Query(False, alias="all"),
+):
+    """Busca livros por título, paginados por cursor
+
+    Exemplo: /api/v1/books/search?title=light&limit=20
+
+    Com `q`, a busca é por relevância: os títulos são ordenados pela pontuação
+    BM25 dos termos, palavras digitadas com erro também encontram resultados
+    (ex: ?q=lihgt attic) e `min_score` descarta os resultados fracos.
+    Não pode ser usado junto com `title`.
+
+    O cursor da próxima página vem no header X-Next-Cursor.
+    Use ?all=true para receber todos os resultados de uma vez.
+    """
+    if q is not None:
+        if title is not None:
+            raise HTTPException(status_code=400, detail="Use title ou q, não os dois")
+        if all_results:
+            return _json_response(rank_books_json(q, min_score))
+
+        content, last = rank_books_page_json(q, limit, min_score, _read_keyset_cursor(cursor))
+        response = _json_response(content)
+        _set_next_keyset_cursor(response, last)
+        return response
+
+    if all_results:
+        return _json_response(search_books_json(title))
+
+    content, last_id = search_books_page_json(title, _read_cursor(cursor), limit)
+    response = _json_response(content)
+    _set_next_cursor(response, last_id)
+    return response
+
+
+@app.get("/api/v1/books/autocomplete", response_model=List[BookSuggestion])
+def autocomplete(
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Sugestões para busca enquanto o usuário digita: títulos que começam com `prefix`
+
+    Retorna só id e título, do maior para o menor rating (e em ordem
+    alfabética no mesmo rating). Exemplo: /api/v1/books/autocomplete?prefix=the%20h&limit=5
+    """
+    return _json_response(autocomplete_json(prefix, limit))
+
+
+@app.get("/api/v1/books/price-range", response_model=List[Book])
+def books_by_price_range(
+    min_price: Optional[float] = Query(None, alias="min", ge=0),
+    max_price: Optional[float] = Query(None, alias="max", ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """Lista livros dentro de uma faixa de preço, do mais barato para o mais caro
+
+    Exemplo: /api/v1/books/price-range?min=10&max=20
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="O preço mínimo não pode ser maior que o máximo")
+
+    content, last = get_books_by_price_range_json(min_price, max_price, limit, _read_keyset_cursor(cursor))
+    response = _json_response(content)
+    _set_next_keyset_cursor(response, last)
+    return response
+
+
+@app.get("/api/v1/books/top-rated", response_model=List[Book])
+def top_rated_books(
+    min_rating: int = Query(5, ge=0, le=5),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """Lista livros com rating >= min_rating, do maior para o menor rating
+
+    Exemplo: /api/v1/books/top-rated?min_rating=4
+    """
+    content, last = get_top_rated_books_json(min_rating, limit, _read_keyset_cursor(cursor))
+    response = _json_response(content)
+    _set_next_keyset_cursor(response, last)
+    return response
 
-    Exemplo: /api/v1/books/search?title=light
+
+@app.get("/api/v1/books/stream")
+def stream_books(
+    title: Optional[str] = None,
+    q: Optional[str] = None,
+    min_score: float = Query(0.0, ge=0),
+):
+    """Exporta os livros em NDJSON (um livro por linha), via streaming
+
+    Aceita os mesmos filtros da busca. Exemplo: /api/v1/books/stream?title=light
+
+    Com `q`, exporta o resultado da busca por relevância, do mais relevante
+    ao menos (ex: /api/v1/books/stream?q=light&min_score=2).
+    Não pode ser usado junto com `title`.
     """
-    results = search_books(title)
-    return results
+    if q is not None and title is not None:
+        raise HTTPException(status_code=400, detail="Use title ou q, não os dois")
+    return StreamingResponse(
+        iter_books_ndjson(title, q, min_score),
+        media_type="application/x-ndjson",
+        headers={"X-Dataset-Version": get_dataset_version()},
+    )
 
 
 @app.get("/api/v1/books/{book_id}", response_model=Book)
 def get_book(book_id: int):
     """Retorna detalhes de um livro específico pelo ID"""
-    book = get_book_by_id(book_id)
+    content = get_book_json(book_id)
 
     # Se não encontrou, retorna erro 404
-    if not book:
+    if content is None:
         raise HTTPException(status_code=404, detail=f"Livro com ID {book_id} não encontrado")
 
-    return book
+    return _json_response(content)
 
 
 @app.get("/api/v1/categories")
-def list_categories():
+def list_categories(request: Request):
     """Lista todas as categorias de livros disponíveis"""
-    books = get_all_books()
+    # Contagens calculadas na carga do CSV, já ordenadas por nome
+    return _payload_response("categories", request)
+
+
+@app.get("/api/v1/stats", response_model=StatsResponse)
+def stats(request: Request):
+    """Estatísticas do catálogo: totais e preço/rating por categoria"""
+    return _payload_response("stats", request)
+
 
-    # Agrupa por categoria e conta
-    categories = {}
-    for book in books:
-        category = book.category
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    # async: roda na thread do event loop, a mesma que atualiza os contadores
+    snapshot = get_snapshot()
+    catalog = {
+        "dataset_version": snapshot.dataset_version,
+        "source_format": snapshot.source_format,
+        "total_books": len(snapshot.books_by_id),
+        "load_seconds": snapshot.load_seconds,
+        "loaded_at": snapshot.loaded_at,
+    }
+    return Response(content=render_metrics(REGISTRY, catalog), media_type=CONTENT_TYPE)
+
+
+# ========== ADMIN ==========
 
-        if category not in categories:
-            categories[category] = 0
-        categories[category] += 1
+@app.post("/api/v1/admin/reload", response_model=ReloadResponse, dependencies=[Depends(require_admin)])
+def reload_catalog(force: bool = False):
+    """Recarrega o CSV sem reiniciar a API
 
-    # Formata resposta ordenada por nome
-    result = [
-        {"name": name, "count": count}
-        for name, count in sorted(categories.items())
-    ]
+    Só troca o catálogo se o arquivo mudou, a não ser que force=true.
+    O novo catálogo é montado por completo antes de entrar no lugar do atual.
+    Com vários workers (uvicorn --workers N), só o worker que recebeu a
+    requisição recarrega; os outros dependem de BOOKS_RELOAD_INTERVAL.
+    """
+    if force:
+        load_books_from_csv(get_snapshot().source_path or BOOKS_CSV_PATH)
+        reloaded = True
+    else:
+        reloaded = reload_books_if_changed()
+
+    snapshot = get_snapshot()
+    return {
+        "reloaded": reloaded,
+        "dataset_version": snapshot.dataset_version,
+        "total_books": len(snapshot.books_by_id),
+    }
+
+
+@app.get("/api/v1/admin/memory", response_model=MemoryReport, dependencies=[Depends(require_admin)])
+def memory_usage():
+    """Uso de memória do catálogo: total, bytes por livro e RSS do processo
+
+    Serve para dimensionar instâncias: bytes_per_book vezes o tamanho
+    esperado do catálogo dá a memória necessária para os dados.
+    """
+    return get_memory_report()
+
+
+@app.get("/api/v1/admin/profiles", response_model=List[ProfileSummary], dependencies=[Depends(require_profiling)])
+def profiles():
+    """Lista as últimas requisições perfiladas (header X-Profile: 1)"""
+    return list_profiles()
+
+
+@app.get("/api/v1/admin/profiles/{profile_id}", response_model=ProfileReport, dependencies=[Depends(require_profiling)])
+def profile_detail(profile_id: int, format: str = Query("json", pattern="^(json|text)$")):
+    """Perfil de uma requisição: tempo por etapa e funções mais caras
+
+    Com format=text retorna a saída do pstats ordenada por tempo acumulado.
+    """
+    if format == "text":
+        text = get_profile_text(profile_id)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Perfil não encontrado")
+        return PlainTextResponse(text)
 
-    return result
+    report = get_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return report
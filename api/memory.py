@@ -0,0 +1,76 @@
+import os
+import resource
+import sys
+from array import array
+from api.catalog import CatalogSnapshot
+
+
+def sizeof(value) -> int:
+    """Bytes ocupados por uma estrutura do snapshot na memória privada do processo
+
+    Visões sobre o arquivo mapeado (memoryview) contam zero: essas páginas
+    são do page cache e divididas entre os workers.
+    """
+    if isinstance(value, memoryview):
+        return 0
+    if isinstance(value, (array, bytes, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if hasattr(value, 'memory_usage'):
+        return sum(value.memory_usage().values())
+    return 0  # Estruturas lidas direto do mmap
+
+
+def process_rss() -> int:
+    """RSS atual do processo em bytes (pico, se /proc não estiver disponível)"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def memory_report(snapshot: CatalogSnapshot) -> dict:
+    """Memória usada por cada parte do catálogo, para dimensionar instâncias"""
+    rows = snapshot.books_data
+    components = dict(rows.memory_usage()) if hasattr(rows, 'memory_usage') else {}
+    components.update(
+        numeric_columns=sum(sizeof(getattr(snapshot, name)) for name in (
+            'prices', 'ratings', 'category_codes', 'category_names', 'availability_codes', 'availability_names',
+        )),
+        sort_orders=sum(sizeof(getattr(snapshot, name)) for name in (
+            'price_order', 'price_keys', 'rating_order', 'rating_keys', 'title_order',
+        )),
+        titles_lower=sizeof(snapshot.titles_lower),
+        title_trigrams=sizeof(snapshot.title_trigrams),
+        text_index=sizeof(snapshot.text_index),
+        filter_index=sizeof(snapshot.filter_index),
+        books_json=sizeof(snapshot.books_json) + sizeof(snapshot.book_rows_json),
+        # Só as variantes comprimidas: o corpo original do catálogo já conta em
+        # books_json. As gravadas no binário são visões sobre o arquivo
+        compressed_payloads=sum(
+            sizeof(payload) for (_, encoding), payload in snapshot.payloads.items() if encoding is not None
+        ),
+    )
+
+    if snapshot.source_format == 'binary':
+        # Binário lido para a memória: as visões acima contam zero, mas o
+        # buffer inteiro é do processo
+        components['binary_file'] = len(snapshot.books_json.obj)
+
+    total_books = len(rows)
+    catalog_bytes = sum(components.values())
+    return {
+        'dataset_version': snapshot.dataset_version,
+        'source_format': snapshot.source_format,
+        'total_books': total_books,
+        'catalog_bytes': catalog_bytes,
+        'bytes_per_book': round(catalog_bytes / total_books, 1) if total_books else 0.0,
+        'process_rss_bytes': process_rss(),
+        'components': components,
+    }
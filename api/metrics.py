@@ -0,0 +1,196 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# Limites (le) dos histogramas; o último bucket é sempre +Inf
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Rótulo das requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """Histograma com buckets fixos no formato do Prometheus"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # bisect_left: o valor entra no primeiro bucket com limite >= valor
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Contagens acumuladas por bucket, como o Prometheus espera"""
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class RouteMetrics:
+    """Métricas de um par (método, rota)"""
+
+    __slots__ = ('statuses', 'latency', 'size')
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+
+class MetricsRegistry:
+    """Métricas das requisições, guardadas no próprio processo
+
+    Só o middleware (que roda na thread do event loop) altera os contadores,
+    então não há lock no caminho das requisições. Com vários workers, cada
+    processo tem seus próprios contadores, como no cliente oficial do Prometheus.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int):
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.latency.observe(seconds)
+        metrics.size.observe(size)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede latência, tamanho e status de cada requisição
+
+    Usa o template da rota (ex: /api/v1/books/{book_id}) como rótulo,
+    para o número de séries não crescer com os IDs pedidos.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.in_flight -= 1
+            # O roteador do Starlette coloca a rota encontrada no scope
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or UNMATCHED_ROUTE
+            registry.observe(scope['method'], path, status, elapsed, size)
+
+
+def _escape(value) -> str:
+    """Escapa um valor de rótulo (barra invertida, aspas e quebra de linha)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    """Formata rótulos no formato de texto do Prometheus"""
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    """Limite do bucket como float (ex: 0.005, 100.0)"""
+    return repr(float(bound))
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: dict) -> List[str]:
+    """Linhas _bucket, _sum e _count de um histograma"""
+    lines = []
+    cumulative = histogram.cumulative()
+    for bound, count in zip(histogram.bounds, cumulative):
+        lines.append(f'{name}_bucket{_labels(**labels, le=_format_bound(bound))} {count}')
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative[-1]}')
+    lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+    return lines
+
+
+def render_metrics(registry: MetricsRegistry, catalog: dict) -> str:
+    """Gera o texto do endpoint /metrics (formato de exposição do Prometheus)
+
+    `catalog` traz o estado do catálogo carregado: versão, total de livros,
+    duração e horário da última carga.
+    """
+    routes = sorted(registry.routes.items(), key=lambda item: item[0])
+
+    lines = [
+        '# HELP books_api_requests_total Requisições HTTP por método, rota e status',
+        '# TYPE books_api_requests_total counter',
+    ]
+    for (method, route), metrics in routes:
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(f'books_api_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+    lines += [
+        '# HELP books_api_request_duration_seconds Latência das requisições em segundos',
+        '# TYPE books_api_request_duration_seconds histogram',
+    ]
+    for (method, route), metrics in routes:
+        lines += _histogram_lines('books_api_request_duration_seconds', metrics.latency, {'method': method, 'route': route})
+
+    lines += [
+        '# HELP books_api_response_size_bytes Tamanho do corpo das respostas em bytes',
+        '# TYPE books_api_response_size_bytes histogram',
+    ]
+    for (method, route), metrics in routes:
+        lines += _histogram_lines('books_api_response_size_bytes', metrics.size, {'method': method, 'route': route})
+
+    lines += [
+        '# HELP books_api_requests_in_flight Requisições sendo atendidas agora',
+        '# TYPE books_api_requests_in_flight gauge',
+        f'books_api_requests_in_flight {registry.in_flight}',
+        '# HELP books_api_catalog_info Versão do dataset carregado',
+        '# TYPE books_api_catalog_info gauge',
+        f'books_api_catalog_info{_labels(dataset_version=catalog["dataset_version"], source_format=catalog["source_format"])} 1',
+        '# HELP books_api_catalog_books Livros no catálogo carregado',
+        '# TYPE books_api_catalog_books gauge',
+        f'books_api_catalog_books {catalog["total_books"]}',
+        '# HELP books_api_catalog_load_duration_seconds Duração da última carga do catálogo',
+        '# TYPE books_api_catalog_load_duration_seconds gauge',
+        f'books_api_catalog_load_duration_seconds {catalog["load_seconds"]}',
+        '# HELP books_api_catalog_loaded_timestamp_seconds Horário (epoch) da última carga do catálogo',
+        '# TYPE books_api_catalog_loaded_timestamp_seconds gauge',
+        f'books_api_catalog_loaded_timestamp_seconds {catalog["loaded_at"]}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+# Registro usado pela aplicação
+REGISTRY = MetricsRegistry()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Book(BaseModel):
     """Modelo que representa um livro"""
@@ -25,7 +25,74 @@ class Book(BaseModel):
         }
 
 
+class BookSuggestion(BaseModel):
+    """Sugestão do autocomplete: só o necessário para mostrar na lista"""
+    id: int
+    title: str
+
+
 class HealthResponse(BaseModel):
     """Resposta do endpoint de health check"""
     status: str
     total_books: int
+
+
+class CategoryStats(BaseModel):
+    """Estatísticas de uma categoria de livros"""
+    name: str
+    count: int
+    min_price: float
+    max_price: float
+    avg_price: float
+    avg_rating: float
+
+
+class StatsResponse(BaseModel):
+    """Resposta do endpoint de estatísticas do catálogo"""
+    dataset_version: str  # Muda sempre que o CSV carregado muda
+    total_books: int
+    total_categories: int
+    avg_price: float
+    avg_rating: float
+    categories: List[CategoryStats]
+
+
+class ReloadResponse(BaseModel):
+    """Resposta do endpoint de recarga do catálogo"""
+    reloaded: bool  # False se o CSV não mudou desde a última carga
+    dataset_version: str
+    total_books: int
+
+
+class MemoryReport(BaseModel):
+    """Resposta do endpoint de uso de memória do catálogo"""
+    dataset_version: str
+    source_format: str  # 'csv', 'binary' ou 'mmap' (com mmap, o que vem do arquivo conta zero)
+    total_books: int
+    catalog_bytes: int  # Soma das estruturas do catálogo na memória do processo
+    bytes_per_book: float
+    process_rss_bytes: int  # RSS do processo inteiro (Python, FastAPI e catálogo)
+    components: Dict[str, int]  # Bytes por parte do catálogo
+
+
+class ProfileSummary(BaseModel):
+    """Resumo de uma requisição perfilada"""
+    id: int
+    method: str
+    path: str
+    total_ms: float
+    stages_ms: Dict[str, float]  # service, validation e serialization
+    created_at: float
+
+
+class ProfileFunction(BaseModel):
+    """Uma função no perfil de uma requisição"""
+    function: str  # arquivo:linha(nome)
+    calls: int
+    total_ms: float  # Tempo na própria função
+    cumulative_ms: float  # Incluindo as funções chamadas por ela
+
+
+class ProfileReport(ProfileSummary):
+    """Perfil completo de uma requisição"""
+    functions: List[ProfileFunction]
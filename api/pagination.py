@@ -0,0 +1,50 @@
+import base64
+import binascii
+import json
+from typing import Optional, Tuple, Union
+
+# Tamanho padrão e máximo de página nos endpoints paginados
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_id: int, key: Union[int, float, None] = None) -> str:
+    """Gera um cursor opaco a partir do último ID (e da chave de ordenação) da página"""
+    data = {'after': last_id}
+    if key is not None:
+        data['key'] = key
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _read_cursor_data(cursor: str) -> dict:
+    """Decodifica o JSON do cursor; lança ValueError se o cursor for inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        after = data['after']
+    except (binascii.Error, UnicodeError, json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+    if not isinstance(after, int) or isinstance(after, bool) or after < 0:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return data
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Retorna o último ID já visto (0 = começo); lança ValueError se o cursor for inválido"""
+    if not cursor:
+        return 0
+    return _read_cursor_data(cursor)['after']
+
+
+def decode_keyset_cursor(cursor: Optional[str]) -> Optional[Tuple[Union[int, float], int]]:
+    """Retorna (chave, último ID) de um cursor ordenado por chave, ou None no começo"""
+    if not cursor:
+        return None
+
+    data = _read_cursor_data(cursor)
+    key = data.get('key')
+    if not isinstance(key, (int, float)) or isinstance(key, bool):
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return key, data['after']
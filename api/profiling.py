@@ -0,0 +1,259 @@
+import asyncio
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import itertools
+import os
+import pstats
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from fastapi.routing import APIRoute
+
+# Quantos perfis ficam guardados na memória (os mais antigos saem primeiro)
+MAX_STORED_PROFILES = 20
+
+# Funções listadas no relatório de texto de cada perfil
+REPORT_FUNCTIONS = 30
+
+# Perfil da requisição atual; só existe durante requisições com X-Profile
+_current_profile: ContextVar[Optional['RequestProfile']] = ContextVar('current_profile', default=None)
+
+# Só uma requisição perfilada por vez: o cProfile liga um único hook na
+# thread, e todas as requisições rodam na mesma thread do event loop
+_profile_lock = asyncio.Lock()
+
+_profile_ids = itertools.count(1)
+_profiles: 'OrderedDict[int, dict]' = OrderedDict()
+
+
+class RequestProfile:
+    """cProfile de uma única requisição"""
+
+    def __init__(self, method: str, path: str):
+        self.id = next(_profile_ids)
+        self.method = method
+        self.path = path
+        self.endpoint = None  # Função do endpoint, preenchida pela rota
+        self.profiler = cProfile.Profile()
+        self.start = 0.0
+        self.elapsed = 0.0
+
+
+class ProfilingRoute(APIRoute):
+    """Rota que, numa requisição perfilada, roda o endpoint síncrono no event loop
+
+    Endpoints `def` normalmente rodam no threadpool, e o cProfile só enxerga a
+    thread em que foi ligado. Para a requisição perfilada, a rota usa uma cópia
+    `async` do endpoint: busca nos serviços, validação do response_model e
+    serialização rodam todas na thread do event loop, dentro do perfil.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        self._route_args = (path, endpoint, kwargs)
+        self._inline_handler = None
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request):
+            profile = _current_profile.get()
+            if profile is None:
+                return await handler(request)
+            profile.endpoint = self.endpoint
+            return await self._get_inline_handler()(request)
+
+        return route_handler
+
+    def _get_inline_handler(self):
+        """Handler da cópia `async` do endpoint, criado no primeiro uso"""
+        if self._inline_handler is None:
+            path, endpoint, kwargs = self._route_args
+            if _is_async(endpoint):
+                self._inline_handler = super().get_route_handler()
+            else:
+                @functools.wraps(endpoint)
+                async def inline_endpoint(*args, **kw):
+                    return endpoint(*args, **kw)
+
+                self._inline_handler = APIRoute(path, inline_endpoint, **kwargs).get_route_handler()
+        return self._inline_handler
+
+
+def _is_async(endpoint) -> bool:
+    """Endpoints async já rodam no event loop e não precisam de cópia"""
+    return inspect.iscoroutinefunction(endpoint) or inspect.isasyncgenfunction(endpoint)
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que perfila requisições com o header X-Profile: 1
+
+    Se `admin_token` estiver definido, a requisição também precisa enviar
+    X-Admin-Token; sem ele, o header X-Profile é ignorado. A resposta sai
+    com os headers X-Profile-Id e Server-Timing (serviço, validação e
+    serialização) e o perfil completo fica em /api/v1/admin/profiles.
+
+    Só uma requisição é perfilada por vez: enquanto um perfil está rodando,
+    as outras com X-Profile rodam sem perfil e respondem com
+    X-Profile-Skipped: busy. O perfil inclui tudo o que roda no event loop
+    nesse intervalo, inclusive outras requisições (não perfiladas) concorrentes.
+    """
+
+    def __init__(self, app, admin_token: str = ""):
+        self.app = app
+        self.admin_token = admin_token
+
+    def _wants_profile(self, scope) -> bool:
+        headers = dict(scope['headers'])
+        if headers.get(b'x-profile') not in (b'1', b'true'):
+            return False
+        if not self.admin_token:
+            return True
+        token = headers.get(b'x-admin-token', b'').decode('latin-1')
+        return hmac.compare_digest(token, self.admin_token)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if _profile_lock.locked():
+            await self.app(scope, receive, _mark_skipped(send))
+            return
+
+        # Liberado em _finish, assim que o profiler desliga (antes do corpo da resposta)
+        await _profile_lock.acquire()
+        await self._profile(scope, receive, send)
+
+    async def _profile(self, scope, receive, send):
+        profile = RequestProfile(scope['method'], scope['path'])
+
+        async def send_wrapper(message):
+            # A resposta já foi montada quando o início dela é enviado
+            if message['type'] == 'http.response.start' and profile.profiler is not None:
+                report = _finish(profile)
+                headers = list(message.get('headers', []))
+                headers.append((b'x-profile-id', str(profile.id).encode()))
+                headers.append((b'server-timing', _server_timing(report['stages_ms']).encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        token = _current_profile.set(profile)
+        profile.start = time.perf_counter()
+        profile.profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile.profiler is not None:
+                _finish(profile)
+            _current_profile.reset(token)
+
+
+def _mark_skipped(send):
+    """Envolve o send para marcar a resposta como não perfilada (outro perfil em andamento)"""
+    async def send_wrapper(message):
+        if message['type'] == 'http.response.start':
+            headers = list(message.get('headers', [])) + [(b'x-profile-skipped', b'busy')]
+            message = {**message, 'headers': headers}
+        await send(message)
+    return send_wrapper
+
+
+def _finish(profile: RequestProfile) -> dict:
+    """Desliga o profiler, calcula as etapas e guarda o relatório"""
+    profiler = profile.profiler
+    profiler.disable()
+    profile.profiler = None
+    _profile_lock.release()
+    profile.elapsed = time.perf_counter() - profile.start
+
+    stats = pstats.Stats(profiler)
+    report = {
+        'id': profile.id,
+        'method': profile.method,
+        'path': profile.path,
+        'total_ms': round(profile.elapsed * 1000, 3),
+        'stages_ms': _stage_times(stats, profile.endpoint),
+        'functions': _top_functions(stats),
+        'created_at': time.time(),
+        '_profiler': profiler,
+    }
+    _profiles[profile.id] = report
+    while len(_profiles) > MAX_STORED_PROFILES:
+        _profiles.popitem(last=False)
+
+    directory = os.getenv("BOOKS_PROFILE_DIR")
+    if directory:
+        # Arquivo .prof para abrir no snakeviz ou pstats
+        os.makedirs(directory, exist_ok=True)
+        stats.dump_stats(os.path.join(directory, f'request-{profile.id}.prof'))
+    return report
+
+
+def _stage_times(stats: pstats.Stats, endpoint) -> Dict[str, float]:
+    """Tempo acumulado (ms) de cada etapa, a partir das funções que marcam cada uma
+
+    - service: a função do endpoint (inclui a busca em api/services.py)
+    - validation: validação do retorno contra o response_model
+    - serialization: conversão para JSON e render da resposta
+    """
+    code = getattr(endpoint, '__code__', None)
+    stages = {'service': 0.0, 'validation': 0.0, 'serialization': 0.0}
+    for (filename, line, name), (_, _, _, cumulative, _) in stats.stats.items():
+        if code is not None and (filename, line, name) == (code.co_filename, code.co_firstlineno, code.co_name):
+            stages['service'] += cumulative
+        elif 'fastapi' in filename and name == 'validate':
+            stages['validation'] += cumulative
+        elif ('fastapi' in filename and name in ('serialize', 'serialize_json', 'jsonable_encoder')
+              or 'starlette' in filename and name == 'render'):
+            stages['serialization'] += cumulative
+    return {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()}
+
+
+def _top_functions(stats: pstats.Stats, limit: int = REPORT_FUNCTIONS) -> List[dict]:
+    """Funções com maior tempo acumulado"""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': f'{os.path.basename(filename)}:{line}({name})',
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, total, cumulative, _) in rows
+    ]
+
+
+def _server_timing(stages_ms: Dict[str, float]) -> str:
+    """Header Server-Timing (aparece na aba de rede do navegador)"""
+    return ', '.join(f'{stage};dur={ms}' for stage, ms in stages_ms.items())
+
+
+def list_profiles() -> List[dict]:
+    """Resumo dos perfis guardados, do mais recente ao mais antigo"""
+    return [
+        {key: report[key] for key in ('id', 'method', 'path', 'total_ms', 'stages_ms', 'created_at')}
+        for report in reversed(list(_profiles.values()))
+    ]
+
+
+def get_profile(profile_id: int) -> Optional[dict]:
+    """Perfil completo (sem o objeto pstats) ou None se não existe mais"""
+    report = _profiles.get(profile_id)
+    if report is None:
+        return None
+    return {key: value for key, value in report.items() if key != '_profiler'}
+
+
+def get_profile_text(profile_id: int) -> Optional[str]:
+    """Saída do pstats (ordenada por tempo acumulado), como no cProfile"""
+    report = _profiles.get(profile_id)
+    if report is None:
+        return None
+    output = io.StringIO()
+    stats = pstats.Stats(report['_profiler'], stream=output)
+    stats.sort_stats('cumulative').print_stats(REPORT_FUNCTIONS)
+    return output.getvalue()
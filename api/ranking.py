@@ -0,0 +1,453 @@
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+from api.rows import PackedStrings, column_nbytes
+
+# Tokens são sequências de letras/dígitos (\w), sempre em minúsculas
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Parâmetros do BM25: saturação da frequência do termo e peso do tamanho do título
+K1 = 1.2
+B = 0.75
+
+# Termos com mais postagens que isso ganham listas ordenadas por impacto, para
+# a busca parar cedo; os demais são pontuados por inteiro (são poucos livros)
+RANKED_POSTINGS_MIN = 1024
+
+# Tolerância a erros de digitação: cada edição multiplica o peso do termo por
+# FUZZY_WEIGHT, e cada token da consulta vira no máximo MAX_EXPANSIONS termos
+FUZZY_WEIGHT = 0.5
+MAX_EXPANSIONS = 5
+
+
+def tokenize(text: str) -> List[str]:
+    """Quebra o texto em tokens minúsculos"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def max_edits(token: str) -> int:
+    """Edições toleradas para um token: nenhuma até 3 letras, 1 até 7 e 2 a partir de 8"""
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 7 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Distância de edição entre a e b, ou limit + 1 se passar de limit
+
+    Conta inserção, remoção, troca e transposição de letras vizinhas
+    ("lihgt" -> "light" é uma edição só).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current.append(distance)
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1  # Nenhum caminho volta para dentro do limite
+        before_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def padded_trigrams(term: str) -> set:
+    """Trigramas do termo com bordas marcadas ($termo$), para comparar termos curtos"""
+    padded = f'${term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class RankedPostings:
+    """Postagens dos termos frequentes em ordem de impacto, em arrays planos
+
+    Os grupos do termo terms[i] são term_groups[i]:term_groups[i + 1]; o
+    grupo j tem tf group_tfs[j] e os livros
+    postings[group_offsets[j]:group_offsets[j + 1]], do menor para o maior
+    título. Os mesmos arrays são gravados no catálogo binário e lidos de lá.
+    """
+    terms: Sequence[int]  # IDs dos termos frequentes, em ordem crescente
+    term_groups: Sequence[int]
+    group_tfs: Sequence[int]  # Crescente dentro de cada termo
+    group_offsets: Sequence[int]
+    postings: Sequence[int]
+
+    def _find(self, term_id: int) -> Optional[int]:
+        """Posição do termo em `terms` (None se ele não é frequente)"""
+        position = bisect_left(self.terms, term_id)
+        if position < len(self.terms) and self.terms[position] == term_id:
+            return position
+        return None
+
+    def __contains__(self, term_id: int) -> bool:
+        return self._find(term_id) is not None
+
+    def get(self, term_id: int) -> Optional[Tuple[int, List[Tuple[int, Sequence[int]]]]]:
+        """(df, [(tf, livros em ordem de impacto)]) do termo, ou None se ele não é frequente"""
+        position = self._find(term_id)
+        if position is None:
+            return None
+        first, last = self.term_groups[position], self.term_groups[position + 1]
+        # Fatias de memoryview: nenhum grupo é copiado
+        postings = memoryview(self.postings)
+        offsets = self.group_offsets
+        groups = [(self.group_tfs[j], postings[offsets[j]:offsets[j + 1]]) for j in range(first, last)]
+        return offsets[last] - offsets[first], groups
+
+    def memory_usage(self) -> dict:
+        """Bytes ocupados pelos arrays"""
+        return {'ranked_postings': sum(column_nbytes(getattr(self, name)) for name in RANKED_COLUMNS)}
+
+
+# Arrays de RankedPostings, na ordem do construtor
+RANKED_COLUMNS = ('terms', 'term_groups', 'group_tfs', 'group_offsets', 'postings')
+
+
+def build_text_index(titles_lower: Sequence[str]) -> 'TextIndex':
+    """Monta o índice de tokens dos títulos (já em minúsculas)"""
+    # Postagens de cada termo em ordem de livro: o livro se repete a cada
+    # ocorrência do termo no título (as repetições dão o tf)
+    postings_of: Dict[str, List[int]] = {}
+    lengths = array('H')
+    for doc, title in enumerate(titles_lower):
+        tokens = TOKEN_PATTERN.findall(title)
+        lengths.append(len(tokens))
+        for token in tokens:
+            postings_of.setdefault(token, []).append(doc)
+
+    # Vocabulário em ordem alfabética; as postagens de todos os termos vão
+    # para um único array, com o início de cada termo em offsets
+    vocabulary = sorted(postings_of)
+    postings = array('I')
+    offsets = array('I', [0])
+    for term in vocabulary:
+        postings.extend(postings_of[term])
+        offsets.append(len(postings))
+
+    # Termos frequentes: grupos por tf (do menor para o maior), cada grupo
+    # do menor para o maior título. Com o mesmo tf, título menor = impacto
+    # maior, então cada grupo já sai em ordem de impacto (e, no empate, de livro)
+    ranked = RankedPostings(array('I'), array('I', [0]), array('I'), array('I', [0]), array('I'))
+    for term_id, term in enumerate(vocabulary):
+        docs = postings_of[term]
+        if len(docs) <= RANKED_POSTINGS_MIN:
+            continue
+        by_tf = group_by_tf(docs)
+        for tf in sorted(by_tf):
+            ranked.group_tfs.append(tf)
+            ranked.postings.extend(sorted(by_tf[tf], key=lengths.__getitem__))
+            ranked.group_offsets.append(len(ranked.postings))
+        ranked.terms.append(term_id)
+        ranked.term_groups.append(len(ranked.group_tfs))
+    del postings_of
+
+    # trigrama -> IDs dos termos (só termos com letras; números não têm erro de digitação)
+    fuzzy: Dict[str, List[int]] = {}
+    for term_id, term in enumerate(vocabulary):
+        if term.isalpha() and len(term) > 3:
+            for gram in padded_trigrams(term):
+                fuzzy.setdefault(gram, []).append(term_id)
+    fuzzy = {gram: array('I', term_ids) for gram, term_ids in fuzzy.items()}
+
+    return TextIndex(titles_lower, PackedStrings(vocabulary), postings, offsets, lengths, ranked, fuzzy)
+
+
+def group_by_tf(postings: Sequence[int]) -> Dict[int, List[int]]:
+    """Livros das postagens de um termo agrupados por tf, cada grupo em ordem de livro"""
+    # Conta as repetições de cada livro; o dict mantém a ordem de livro
+    tf_of: Dict[int, int] = {}
+    for doc in postings:
+        tf_of[doc] = tf_of.get(doc, 0) + 1
+
+    by_tf: Dict[int, List[int]] = {}
+    for doc, tf in tf_of.items():
+        by_tf.setdefault(tf, []).append(doc)
+    return by_tf
+
+
+class TextIndex:
+    """Índice invertido de tokens dos títulos, com ranking BM25 e busca aproximada
+
+    - Vocabulário ordenado (PackedStrings ou a tabela de strings do binário):
+      o ID do termo é a posição dele, achada por busca binária
+    - Postagens de todos os termos num único array, em ordem de livro,
+      com uma tabela de offsets por termo
+    - Termos frequentes têm também as postagens em ordem de impacto (BM25
+      decrescente), separadas por frequência do termo no título, para a
+      busca top-k parar assim que nenhum livro não visto possa entrar
+    - Índice de trigramas do vocabulário (só termos com letras), para
+      achar termos a poucas edições de um token digitado errado
+
+    Montado por build_text_index ou a partir das seções do catálogo binário
+    (as partes são arrays ou memoryviews com o mesmo conteúdo).
+    """
+
+    def __init__(
+        self,
+        titles_lower: Sequence[str],
+        terms: Sequence[str],
+        postings: Sequence[int],
+        offsets: Sequence[int],
+        lengths: Sequence[int],
+        ranked: RankedPostings,
+        fuzzy,
+    ):
+        self._titles = titles_lower
+        self._terms = terms
+        self._postings = postings
+        self._offsets = offsets
+        self._lengths = lengths
+        self._ranked = ranked
+        # trigrama -> IDs dos termos: dict em memória ou MappedTrigramIndex (mesmo .get)
+        self._fuzzy = fuzzy
+
+        self._total = len(lengths)
+        self._avgdl = sum(lengths) / self._total if self._total else 0.0
+        self._max_length = max(lengths, default=0)
+
+    @property
+    def terms(self) -> Sequence[str]:
+        """Vocabulário, em ordem alfabética"""
+        return self._terms
+
+    @property
+    def fuzzy(self):
+        """Índice trigrama -> IDs dos termos do vocabulário"""
+        return self._fuzzy
+
+    def columns(self) -> Dict[str, Sequence[int]]:
+        """Arrays do índice por nome, para gravar no catálogo binário"""
+        columns = {'postings': self._postings, 'offsets': self._offsets, 'lengths': self._lengths}
+        columns.update((f'ranked_{name}', getattr(self._ranked, name)) for name in RANKED_COLUMNS)
+        return columns
+
+    def _group_by_tf(self, term_id: int) -> Dict[int, List[int]]:
+        """Livros com o termo agrupados por tf"""
+        return group_by_tf(self._postings[self._offsets[term_id]:self._offsets[term_id + 1]])
+
+    def __len__(self):
+        return self._total
+
+    def memory_usage(self) -> dict:
+        """Bytes ocupados pelo índice na memória do processo"""
+        if isinstance(self._fuzzy, dict):
+            fuzzy = sum(term_ids.itemsize * len(term_ids) for term_ids in self._fuzzy.values())
+        else:
+            fuzzy = 0  # Lido do catálogo binário
+        return {
+            'text_index': (
+                getattr(self._terms, 'nbytes', 0) + fuzzy
+                + sum(self._ranked.memory_usage().values())
+                + sum(column_nbytes(column) for column in (self._postings, self._offsets, self._lengths))
+            ),
+        }
+
+    def term_id(self, term: str) -> Optional[int]:
+        """ID do termo no vocabulário (None se nenhum título tem o termo)"""
+        position = bisect_left(self._terms, term)
+        if position < len(self._terms) and self._terms[position] == term:
+            return position
+        return None
+
+    def document_frequency(self, term_id: int) -> int:
+        """Em quantos títulos o termo aparece"""
+        ranked = self._ranked.get(term_id)
+        if ranked is not None:
+            return ranked[0]
+        return len(set(self._postings[self._offsets[term_id]:self._offsets[term_id + 1]]))
+
+    def similar_terms(self, token: str) -> List[Tuple[int, int]]:
+        """Termos do vocabulário a até max_edits(token) edições: [(ID, edições)]
+
+        Cada edição destrói no máximo 4 trigramas, o que descarta a maioria
+        dos termos sem calcular a distância; os que sobram são conferidos com
+        edit_distance. Retorna os MAX_EXPANSIONS mais próximos (e mais comuns).
+        """
+        limit = max_edits(token)
+        if not limit or not token.isalpha():
+            return []
+        grams = padded_trigrams(token)
+        shared = Counter(chain.from_iterable(self._fuzzy.get(gram, ()) for gram in grams))
+        min_shared = max(len(grams) - 4 * limit, 1)
+
+        matches = []
+        for term_id, common in shared.items():
+            if common < min_shared:
+                continue
+            edits = edit_distance(token, self._terms[term_id], limit)
+            if edits <= limit:
+                matches.append((edits, -self.document_frequency(term_id), term_id))
+        return [(term_id, edits) for edits, _, term_id in sorted(matches)[:MAX_EXPANSIONS]]
+
+    def query_terms(self, query: str) -> List[Tuple[str, int, float]]:
+        """Termos pesquisados: (termo, ID, peso × idf)
+
+        Tokens que não existem no vocabulário são trocados pelos termos
+        próximos, com peso menor a cada edição.
+        """
+        weights: Dict[int, float] = {}
+        for token in tokenize(query):
+            term_id = self.term_id(token)
+            expansions = [(term_id, 0)] if term_id is not None else self.similar_terms(token)
+            for term_id, edits in expansions:
+                weights[term_id] = max(weights.get(term_id, 0.0), FUZZY_WEIGHT ** edits)
+
+        terms = []
+        for term_id, weight in sorted(weights.items()):
+            df = self.document_frequency(term_id)
+            idf = math.log(1 + (self._total - df + 0.5) / (df + 0.5))
+            terms.append((self._terms[term_id], term_id, weight * idf))
+        return terms
+
+    def _norm(self, length: int) -> float:
+        """Parte do denominador do BM25 que depende do tamanho do título"""
+        return K1 * (1 - B + B * length / self._avgdl)
+
+    def score(self, doc: int, terms: List[Tuple[str, int, float]]) -> float:
+        """Pontuação BM25 de um título para os termos da consulta"""
+        tokens = TOKEN_PATTERN.findall(self._titles[doc])
+        norm = self._norm(len(tokens))
+        total = 0.0
+        for term, _, weight in terms:
+            tf = tokens.count(term)
+            if tf:
+                total += weight * tf * (K1 + 1) / (tf + norm)
+        return total
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        min_score: float = 0.0,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[Tuple[float, int]]:
+        """Livros que casam com a consulta: [(pontuação, posição)], do mais relevante ao menos
+
+        Empates ficam em ordem de posição. `after` = (pontuação, posição) do
+        último resultado já visto, para paginar; `limit=None` retorna todos.
+        """
+        terms = self.query_terms(query)
+        if not terms:
+            return []
+        if limit is None:
+            return self._search_all(terms, min_score, after)
+        return self._search_top(terms, limit, min_score, after)
+
+    @staticmethod
+    def _accepts(score: float, doc: int, min_score: float, after: Optional[Tuple[float, int]]) -> bool:
+        """O resultado passa do mínimo e vem depois do cursor?"""
+        if score <= 0 or score < min_score:
+            return False
+        return after is None or (-score, doc) > (-after[0], after[1])
+
+    def _accumulate(self, terms) -> Dict[int, float]:
+        """Pontuação de todos os livros que têm algum dos termos, somada termo a termo
+
+        Não relê os títulos: o impacto de cada termo só depende do tf e do
+        tamanho do título, então sai de uma tabela por tamanho.
+        """
+        lengths = self._lengths
+        scores: Dict[int, float] = {}
+        get = scores.get
+        for _, term_id, weight in terms:
+            for tf, docs in self._term_groups(term_id):
+                impacts = self._impacts(weight, tf)
+                for doc in docs:
+                    scores[doc] = get(doc, 0.0) + impacts[lengths[doc]]
+        return scores
+
+    def _search_all(self, terms, min_score, after) -> List[Tuple[float, int]]:
+        """Todos os livros que têm algum dos termos"""
+        accepts = self._accepts
+        results = [
+            (score, doc) for doc, score in self._accumulate(terms).items()
+            if accepts(score, doc, min_score, after)
+        ]
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return results
+
+    def _term_groups(self, term_id: int) -> List[Tuple[int, Sequence[int]]]:
+        """Livros do termo agrupados por tf: [(tf, livros)], do maior tf para o menor
+
+        Nos termos frequentes cada grupo está em ordem de impacto decrescente.
+        """
+        ranked = self._ranked.get(term_id)
+        groups = ranked[1] if ranked is not None else self._group_by_tf(term_id).items()
+        return sorted(groups, key=lambda group: group[0], reverse=True)
+
+    def _impacts(self, weight: float, tf: int) -> List[float]:
+        """Impacto do termo para cada tamanho de título (mesma conta de score)"""
+        return [weight * tf * (K1 + 1) / (tf + self._norm(length)) for length in range(self._max_length + 1)]
+
+    def _search_top(self, terms, limit, min_score, after) -> List[Tuple[float, int]]:
+        """Top-k pelo MaxScore: termos do mais raro para o mais comum
+
+        Um livro que só tem termos ainda não processados soma no máximo os
+        impactos máximos desses termos (`rest`). Quando isso não alcança o
+        k-ésimo resultado, os termos comuns (the, of, a...) só servem para
+        completar a pontuação de livros já encontrados e não trazem candidatos.
+        Dentro de cada termo, livros cujo impacto mais `rest` não alcança o
+        k-ésimo são descartados sem reler o título.
+        """
+        lengths = self._lengths
+        plan = []
+        for _, term_id, weight in terms:
+            ordered = term_id in self._ranked
+            tables = [(self._impacts(weight, tf), docs) for tf, docs in self._term_groups(term_id)]
+            # O maior impacto é o do menor título (o primeiro, nos grupos ordenados)
+            max_impact = max(
+                impacts[lengths[docs[0]] if ordered else min(map(lengths.__getitem__, docs))]
+                for impacts, docs in tables
+            )
+            plan.append((max_impact, ordered, tables))
+        plan.sort(key=lambda item: item[0], reverse=True)
+
+        heap: List[Tuple[float, int]] = []  # (pontuação, -posição): o pior resultado fica no topo
+        seen = set()
+        remaining = sum(item[0] for item in plan)
+        for index, (max_impact, ordered, tables) in enumerate(plan):
+            rest = remaining - max_impact
+            remaining = rest
+            if max_impact + rest < min_score:
+                break
+            if len(heap) == limit and heap[0][0] > max_impact + rest:
+                break  # Livro novo nenhum alcança o k-ésimo
+            last = index == len(plan) - 1
+
+            for impacts, docs in tables:
+                for doc in docs:
+                    if doc in seen:
+                        continue
+                    impact = impacts[lengths[doc]]
+                    floor = heap[0][0] if len(heap) == limit else 0.0
+                    if impact + rest < max(floor, min_score):
+                        if ordered:
+                            break  # Os próximos do grupo têm impacto ainda menor
+                        continue
+                    seen.add(doc)
+                    # Livro ainda não visto não tem os termos anteriores; no último termo
+                    # o impacto já é a pontuação inteira
+                    score = impact if last else self.score(doc, terms)
+                    if not self._accepts(score, doc, min_score, after):
+                        continue
+                    item = (score, -doc)
+                    if len(heap) < limit:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+
+        return sorted(((score, -doc) for score, doc in heap), key=lambda item: (-item[0], item[1]))
@@ -0,0 +1,121 @@
+import os
+from array import array
+from collections.abc import Sequence
+from typing import Iterable, List, Tuple
+
+
+class PackedStrings(Sequence):
+    """Strings guardadas num único bloco UTF-8 com a tabela de offsets
+
+    Evita um objeto str por item (~50 bytes de overhead cada); cada
+    string é decodificada só quando é lida.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        blob = bytearray()
+        offsets = array('Q', [0])
+        for text in texts:
+            blob += text.encode('utf-8')
+            offsets.append(len(blob))
+        self._blob = bytes(blob)
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelo bloco e pelos offsets"""
+        return len(self._blob) + self._offsets.itemsize * len(self._offsets)
+
+
+def column_nbytes(column) -> int:
+    """Bytes de uma coluna na memória do processo (visões sobre o catálogo binário contam zero)"""
+    if isinstance(column, memoryview):
+        return 0
+    return column.itemsize * len(column)
+
+
+def encode_values(values: Iterable[str]) -> Tuple[array, List[str]]:
+    """Codifica valores repetidos como índices num dicionário: (códigos, nomes)
+
+    Os nomes ficam em ordem alfabética e existem uma única vez na memória.
+    """
+    values = list(values)
+    names = sorted(set(values))
+    code_of = {name: code for code, name in enumerate(names)}
+    codes = array('B' if len(names) <= 256 else 'I', (code_of[value] for value in values))
+    return codes, names
+
+
+def split_common_prefix(texts: List[str]) -> Tuple[str, List[str]]:
+    """Separa o prefixo comum (até a última '/') e o sufixo de cada texto"""
+    prefix = os.path.commonprefix(texts) if texts else ''
+    prefix = prefix[:prefix.rfind('/') + 1]
+    return prefix, [text[len(prefix):] for text in texts]
+
+
+class BookRows(Sequence):
+    """Linhas do catálogo guardadas em colunas compactas
+
+    Substitui a lista de dicts do CSV: títulos e sufixos de URL em blocos
+    compactados, disponibilidade e categoria como códigos num dicionário
+    de valores e o prefixo comum das URLs de imagem guardado uma vez só.
+    Cada linha (dict) é montada sob demanda, como em MappedRows.
+    """
+
+    def __init__(
+        self,
+        titles: List[str],
+        image_urls: List[str],
+        prices: array,
+        ratings: array,
+        category_codes: array,
+        category_names: List[str],
+        availability_codes: array,
+        availability_names: List[str],
+    ):
+        self._titles = PackedStrings(titles)
+        self._image_url_prefix, suffixes = split_common_prefix(image_urls)
+        self._image_url_suffixes = PackedStrings(suffixes)
+        # Colunas numéricas, de categoria e de disponibilidade são as mesmas do snapshot (sem cópia)
+        self._prices = prices
+        self._ratings = ratings
+        self._category_codes = category_codes
+        self._category_names = category_names
+        self._availability_codes = availability_codes
+        self._availability_names = availability_names
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return {
+            'title': self._titles[index],
+            'price': self._prices[index],
+            'rating': self._ratings[index],
+            'availability': self._availability_names[self._availability_codes[index]],
+            'category': self._category_names[self._category_codes[index]],
+            'image_url': self._image_url_prefix + self._image_url_suffixes[index],
+            'id': index + 1,
+        }
+
+    def memory_usage(self) -> dict:
+        """Bytes ocupados por coluna própria (as colunas de código contam no snapshot)"""
+        return {
+            'titles': self._titles.nbytes,
+            'image_urls': self._image_url_suffixes.nbytes + len(self._image_url_prefix),
+        }
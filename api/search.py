@@ -0,0 +1,138 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Tamanho do n-grama usado no índice invertido de títulos
+NGRAM_SIZE = 3
+
+# Listas de postagens muito maiores que a mais seletiva não são consultadas:
+# é mais barato confirmar a substring direto no título
+MAX_INTERSECT_RATIO = 8
+
+
+def trigrams(text: str) -> set:
+    """Retorna o conjunto de trigramas de um texto"""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def build_trigram_index(titles_lower: List[str]) -> Dict[str, array]:
+    """Monta o índice invertido trigrama -> posições dos títulos (em ordem crescente)
+
+    As postagens ficam em arrays de inteiros de 4 bytes em vez de listas
+    de int do Python (8 bytes de ponteiro + 28 do objeto por posição).
+    """
+    index: Dict[str, List[int]] = {}
+    for position, title in enumerate(titles_lower):
+        for gram in trigrams(title):
+            index.setdefault(gram, []).append(position)
+    return {gram: array('I', positions) for gram, positions in index.items()}
+
+
+def iter_substring(
+    index: Dict[str, List[int]],
+    titles_lower: List[str],
+    query_lower: str,
+    start: int = 0,
+) -> Iterator[int]:
+    """Gera, em ordem, as posições >= start dos títulos que contêm query_lower"""
+    # Consultas curtas não têm trigramas: varre os títulos já em minúsculas
+    if len(query_lower) < NGRAM_SIZE:
+        return (i for i in range(start, len(titles_lower)) if query_lower in titles_lower[i])
+
+    postings = []
+    for gram in trigrams(query_lower):
+        posting = index.get(gram)
+        if posting is None:
+            return iter(())  # Algum trigrama não existe em nenhum título
+        postings.append(posting)
+
+    # Trigramas em comum não garantem a substring: confirma cada candidato
+    return (i for i in _intersect(postings, start) if query_lower in titles_lower[i])
+
+
+def _intersect(postings: List[Sequence[int]], start: int) -> Iterator[int]:
+    """Gera, em ordem, as posições >= start presentes em todas as listas (ordenadas)
+
+    Percorre a lista mais seletiva a partir de start e procura cada posição
+    nas outras por busca binária, então o custo acompanha os resultados
+    consumidos, não o total de candidatos.
+    """
+    postings = sorted(postings, key=len)
+    driver = postings[0]
+    others = [posting for posting in postings[1:] if len(posting) <= MAX_INTERSECT_RATIO * len(driver)]
+    # Onde cada lista começa a ser procurada; só avança, como as posições do driver
+    cursors = [bisect_left(posting, start) for posting in others]
+    for position in driver[bisect_left(driver, start):]:
+        for k, posting in enumerate(others):
+            j = cursors[k] = bisect_left(posting, position, cursors[k])
+            if j == len(posting) or posting[j] != position:
+                break
+        else:
+            yield position
+
+
+def find_substring(
+    index: Dict[str, List[int]],
+    titles_lower: List[str],
+    query_lower: str,
+    start: int = 0,
+    limit: Optional[int] = None,
+) -> List[int]:
+    """Retorna as posições (em ordem) dos títulos que contêm query_lower
+
+    Só considera posições >= start e para depois de `limit` resultados.
+    """
+    return list(islice(iter_substring(index, titles_lower, query_lower, start), limit))
+
+
+def build_title_order(titles_lower: Sequence[str], ratings: array) -> array:
+    """Posições ordenadas por (-rating, título em minúsculas, id), para o autocomplete
+
+    Dentro de cada bloco de mesmo rating os títulos ficam em ordem
+    alfabética, então um prefixo vira uma faixa contínua do bloco.
+    """
+    # Ordenações estáveis: a última (rating) decide, as anteriores desempatam
+    by_title = sorted(range(len(titles_lower)), key=titles_lower.__getitem__)
+    return array('I', sorted(by_title, key=lambda i: -ratings[i]))
+
+
+class OrderedTitles(Sequence):
+    """Títulos na ordem de title_order, sem copiar (para busca binária)"""
+
+    def __init__(self, titles_lower: Sequence[str], order: array):
+        self._titles = titles_lower
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, index):
+        return self._titles[self._order[index]]
+
+
+def find_prefix(
+    titles_lower: Sequence[str],
+    title_order: array,
+    rating_keys: array,
+    prefix_lower: str,
+    limit: int,
+) -> List[int]:
+    """Posições dos títulos que começam com prefix_lower, do maior para o menor rating
+
+    `rating_keys` (-rating em ordem crescente) dá os limites de cada bloco
+    de rating, que são os mesmos em title_order. Em cada bloco, a faixa do
+    prefixo sai de uma busca binária, então o custo não depende de quantos
+    títulos casam.
+    """
+    titles = OrderedTitles(titles_lower, title_order)
+    positions: List[int] = []
+    start = 0
+    while start < len(title_order) and len(positions) < limit:
+        end = bisect_right(rating_keys, rating_keys[start], start)
+        i = bisect_left(titles, prefix_lower, start, end)
+        while i < end and len(positions) < limit and titles[i].startswith(prefix_lower):
+            positions.append(title_order[i])
+            i += 1
+        start = end
+    return positions
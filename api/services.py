@@ -1,62 +1,504 @@
-import csv
-from typing import List, Optional
-from api.models import Book
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import replace
+from itertools import islice
+from typing import Iterator, List, Optional, Sequence, Tuple
+from api.catalog import (
+    PAYLOADS, CatalogSnapshot, build_snapshot, join_json_array, load_snapshot_from_csv, payload_bodies,
+    source_signature,
+)
+from api.compression import ENCODINGS, LARGE_PAYLOAD_SIZE, compress
+from api.memory import memory_report
+from api.models import Book, StatsResponse
+from api.search import find_prefix, find_substring, iter_substring
 
-# Variável global para armazenar os livros em memória
-books_data: List[dict] = []
+# Quantas linhas NDJSON são agrupadas em cada pedaço enviado no streaming
+STREAM_BATCH_SIZE = 256
 
+# Snapshot publicado do catálogo. É trocado inteiro (uma única atribuição)
+# a cada carga, então cada função lê `_snapshot` uma vez e usa só essa cópia
+_snapshot: CatalogSnapshot = build_snapshot([])
 
-def load_books_from_csv(filepath: str = 'data/books.csv'):
-    """Carrega os livros do CSV para memória"""
-    global books_data
+# Garante que só uma recarga monte snapshot por vez
+_reload_lock = threading.Lock()
 
-    # Lê o CSV usando biblioteca csv nativa
-    with open(filepath, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        books_data = list(reader)
+# Se o catálogo binário deve ser mapeado em memória (compartilhado entre workers)
+_use_mmap = False
+
+# Thread que observa o CSV e recarrega quando ele muda
+_watcher_thread: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+# Assinatura nova vista na verificação anterior e ainda não carregada: o
+# watcher só recarrega quando ela se repete, ou seja, quando o arquivo parou de mudar
+_pending_signature: Optional[tuple] = None
+
+
+def load_books_from_csv(filepath: str = 'data/books.csv', use_mmap: Optional[bool] = None) -> CatalogSnapshot:
+    """Carrega os livros do CSV para memória
+
+    O novo snapshot (dados, índices e payloads) é montado por inteiro
+    antes de substituir o atual, então requisições em andamento nunca
+    veem uma carga pela metade. Com use_mmap=True o catálogo binário é
+    mapeado em memória; a escolha vale também para as próximas recargas.
+    """
+    global _snapshot, _use_mmap
+
+    with _reload_lock:
+        if use_mmap is not None:
+            _use_mmap = use_mmap
+        snapshot = load_snapshot_from_csv(filepath, use_mmap=_use_mmap)
+        # Arquivo regravado com os mesmos dados: mantém o Last-Modified anterior,
+        # para os caches dos clientes continuarem válidos
+        if snapshot.dataset_version == _snapshot.dataset_version and _snapshot.last_modified:
+            snapshot = replace(snapshot, last_modified=_snapshot.last_modified)
+        # Variantes comprimidas prontas antes da troca: vêm do binário ou são
+        # comprimidas agora nos níveis rápidos. Carregado do CSV com os mesmos
+        # dados, reaproveita as atuais
+        pending = []
+        if not snapshot.payloads and snapshot.dataset_version == _snapshot.dataset_version and _snapshot.payloads:
+            payloads = _snapshot.payloads
+        else:
+            payloads, pending = _build_payloads(snapshot)
+        _snapshot = replace(snapshot, payloads=payloads)
+
+    if pending:
+        threading.Thread(
+            target=_upgrade_payloads, args=(payloads, pending), name="payload-upgrade", daemon=True
+        ).start()
+
+    origin = {
+        'binary': "do binário", 'mmap': "do binário mapeado em memória",
+    }.get(snapshot.source_format, "do CSV")
+    print(f"✓ {len(snapshot.books_data)} livros carregados {origin} (versão {snapshot.dataset_version})")
+    return snapshot
+
+
+def _build_payloads(snapshot: CatalogSnapshot) -> Tuple[dict, List[tuple]]:
+    """Completa os payloads do snapshot: a forma original de cada corpo de
+    PAYLOADS e as variantes que não vieram gravadas no binário
+
+    As que faltam são comprimidas nos níveis rápidos. Retorna os payloads e
+    as chaves (nome, codificação) que valem ser recomprimidas nos níveis
+    máximos depois da troca (as de corpos até LARGE_PAYLOAD_SIZE).
+    """
+    payloads = dict(snapshot.payloads)
+    pending = []
+    for name, body in payload_bodies(snapshot).items():
+        payloads[(name, None)] = body
+        for encoding in ENCODINGS:
+            if (name, encoding) not in payloads:
+                payloads[(name, encoding)] = compress(body, encoding, fast=True)
+                if len(body) <= LARGE_PAYLOAD_SIZE:
+                    pending.append((name, encoding))
+    return payloads, pending
 
-    # Adiciona ID sequencial e converte tipos
-    for i, book in enumerate(books_data, start=1):
-        book['id'] = i
-        try:
-            book['price'] = float(book['price'])
-        except (ValueError, KeyError):
-            book['price'] = 0.0
 
+def _upgrade_payloads(payloads: dict, pending: List[tuple]):
+    """Recomprime nos níveis máximos, em segundo plano, as variantes feitas na carga
+
+    Cada variante é trocada no dict do snapshot publicado (uma atribuição; o
+    conteúdo descomprimido, e portanto a ETag, continua o mesmo). Para se
+    outra carga já publicou um snapshot novo.
+    """
+    for name, encoding in pending:
+        if _snapshot.payloads is not payloads:
+            return
+        payloads[(name, encoding)] = compress(payloads[(name, None)], encoding)
+
+
+def reload_books_if_changed(wait_until_stable: bool = False) -> bool:
+    """Recarrega o CSV atual se ele (ou o binário dele) mudou no disco
+
+    Com wait_until_stable=True (usado pelo watcher), a recarga só acontece
+    quando a mesma assinatura nova aparece em duas chamadas seguidas: um
+    arquivo que ainda está sendo escrito no lugar muda de tamanho/mtime entre
+    uma verificação e outra e não é publicado pela metade.
+
+    Retorna True se um novo snapshot foi publicado.
+    """
+    global _pending_signature
+
+    current = _snapshot
+    if current.source_path is None:
+        return False
+
+    signature = source_signature(current.source_path)
+    if signature == current.source_signature or signature[0] is None and signature[1] is None:
+        _pending_signature = None
+        return False  # Nada mudou, ou arquivo sendo substituído (tenta na próxima)
+
+    if wait_until_stable and signature != _pending_signature:
+        _pending_signature = signature
+        return False  # Mudou agora: confirma na próxima verificação que parou de mudar
+
+    _pending_signature = None
+    load_books_from_csv(current.source_path)
+    return True
+
+
+def _watch_loop(interval: float):
+    """Verifica o CSV a cada `interval` segundos até o watcher ser parado"""
+    while not _watcher_stop.wait(interval):
         try:
-            book['rating'] = int(book['rating'])
-        except (ValueError, KeyError):
-            book['rating'] = 0
+            reload_books_if_changed(wait_until_stable=True)
+        except Exception as e:
+            # Mantém o snapshot anterior se o novo CSV estiver inválido
+            print(f"❌ ERRO ao recarregar o CSV: {e}")
+
 
-        # Garante que category existe (retrocompatibilidade com CSV antigo)
-        if 'category' not in book or not book.get('category', '').strip():
-            book['category'] = 'Unknown'
+def start_reload_watcher(interval: float):
+    """Inicia a thread que recarrega o CSV automaticamente quando ele muda"""
+    global _watcher_thread
 
-    print(f"✓ {len(books_data)} livros carregados do CSV")
+    if _watcher_thread is not None and _watcher_thread.is_alive():
+        return
+
+    _watcher_stop.clear()
+    _watcher_thread = threading.Thread(
+        target=_watch_loop, args=(interval,), name="books-csv-watcher", daemon=True
+    )
+    _watcher_thread.start()
+    print(f"👀 Observando o CSV a cada {interval}s")
+
+
+def stop_reload_watcher():
+    """Para a thread de recarga automática (se estiver rodando)"""
+    global _watcher_thread
+
+    _watcher_stop.set()
+    if _watcher_thread is not None:
+        _watcher_thread.join()
+        _watcher_thread = None
+
+
+def get_snapshot() -> CatalogSnapshot:
+    """Retorna o snapshot publicado do catálogo"""
+    return _snapshot
 
 
 def get_all_books() -> List[Book]:
     """Retorna todos os livros"""
-    return [Book(**book) for book in books_data]
+    return list(_snapshot.books_by_id)
+
+
+def get_all_books_json() -> bytes:
+    """Retorna o catálogo completo já serializado em JSON"""
+    return _snapshot.books_json
+
+
+def get_books_page_json(after_id: int, limit: int) -> Tuple[bytes, Optional[int]]:
+    """Retorna uma página do catálogo em JSON e o último ID dela (None se não há mais)
+
+    Os IDs são sequenciais, então a página começa na posição after_id
+    e o custo é proporcional só ao tamanho da página.
+    """
+    all_rows = _snapshot.book_rows_json
+    rows = all_rows[after_id:after_id + limit]
+    last_id = after_id + len(rows)
+    has_more = last_id < len(all_rows)
+    return join_json_array(rows), (last_id if has_more else None)
+
+
+def _value_code(names: List[str], value: str) -> Optional[int]:
+    """Código de um valor num dicionário de nomes em ordem alfabética (None se não existe)"""
+    code = bisect_left(names, value)
+    if code < len(names) and names[code] == value:
+        return code
+    return None
+
+
+def _filter_positions(
+    snapshot: CatalogSnapshot,
+    start: int,
+    limit: Optional[int],
+    category: Optional[str] = None,
+    availability: Optional[str] = None,
+    rating: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+) -> List[int]:
+    """Posições (em ordem) dos livros que passam por todos os filtros, a partir de start"""
+    equals = {}
+    for name, names, value in (
+        ('category', snapshot.category_names, category),
+        ('availability', snapshot.availability_names, availability),
+    ):
+        if value is not None:
+            code = _value_code(names, value)
+            if code is None:
+                return []  # Nenhum livro tem esse valor
+            equals[name] = code
+    if rating is not None:
+        equals['rating'] = rating
+
+    index = snapshot.filter_index
+    return index.find(index.plan(equals, min_price, max_price), start, limit)
+
+
+def filter_books_json(**filters) -> bytes:
+    """Todos os livros que passam pelos filtros (categoria, disponibilidade, rating, preço), em JSON"""
+    snapshot = _snapshot
+    rows = snapshot.book_rows_json
+    return join_json_array([rows[i] for i in _filter_positions(snapshot, 0, None, **filters)])
+
+
+def filter_books_page_json(after_id: int, limit: int, **filters) -> Tuple[bytes, Optional[int]]:
+    """Página de livros que passam pelos filtros, a partir do ID after_id, em JSON
+
+    Retorna o JSON da página e o ID do último livro dela, ou None se não há mais resultados.
+    """
+    snapshot = _snapshot
+    # Busca um a mais para saber se existe próxima página
+    positions = _filter_positions(snapshot, after_id, limit + 1, **filters)
+    has_more = len(positions) > limit
+    positions = positions[:limit]
+    rows = snapshot.book_rows_json
+    return join_json_array([rows[i] for i in positions]), (positions[-1] + 1 if has_more else None)
+
+
+def get_total_books() -> int:
+    """Retorna o número de livros carregados"""
+    return len(_snapshot.books_by_id)
+
+
+def get_memory_report() -> dict:
+    """Retorna o uso de memória do catálogo carregado"""
+    return memory_report(_snapshot)
+
+
+def get_categories() -> List[dict]:
+    """Retorna as categorias com a contagem de livros (pré-calculadas na carga)"""
+    return _snapshot.categories_summary
+
+
+def get_stats() -> StatsResponse:
+    """Retorna as estatísticas do catálogo (pré-calculadas na carga)"""
+    return _snapshot.catalog_stats
+
+
+def get_dataset_version() -> str:
+    """Retorna a versão do dataset carregado"""
+    return _snapshot.dataset_version
+
+
+def get_payload(name: str, encoding: Optional[str] = None) -> bytes:
+    """Retorna um corpo de PAYLOADS em JSON, comprimido em `encoding` ('br', 'gzip' ou None)
+
+    As variantes ficam prontas antes da troca do snapshot (gravadas no
+    binário ou comprimidas na carga); as requisições só recebem os bytes.
+    """
+    snapshot = _snapshot
+    payload = snapshot.payloads.get((name, encoding))
+    if payload is not None:
+        return payload
+    # Snapshot vazio do início, antes da primeira carga
+    body = PAYLOADS[name](snapshot)
+    return body if encoding is None else compress(body, encoding, fast=True)
 
 
 def get_book_by_id(book_id: int) -> Optional[Book]:
-    """Busca um livro pelo ID"""
-    for book in books_data:
-        if book['id'] == book_id:
-            return Book(**book)
+    """Busca um livro pelo ID em O(1)"""
+    books_by_id = _snapshot.books_by_id
+
+    # IDs vão de 1 a N, então o índice na lista é id - 1
+    if 1 <= book_id <= len(books_by_id):
+        return books_by_id[book_id - 1]
     return None  # Não encontrou
 
 
+def get_book_json(book_id: int) -> Optional[bytes]:
+    """JSON de um livro pelo ID (gerado na carga), ou None se não existe"""
+    rows = _snapshot.book_rows_json
+    if 1 <= book_id <= len(rows):
+        return rows[book_id - 1]
+    return None
+
+
+def _search_positions(snapshot: CatalogSnapshot, title: str) -> List[int]:
+    """Posições dos livros cujo título contém `title` (case-insensitive)"""
+    # Usa o índice de trigramas e confirma só os candidatos
+    return find_substring(snapshot.title_trigrams, snapshot.titles_lower, title.lower())
+
+
 def search_books(title: Optional[str] = None) -> List[Book]:
     """Busca livros por título (case-insensitive)"""
+    snapshot = _snapshot
+    if not title:
+        return list(snapshot.books_by_id)
+    return [snapshot.books_by_id[i] for i in _search_positions(snapshot, title)]
+
+
+def search_books_json(title: Optional[str] = None) -> bytes:
+    """Igual a search_books, mas já em JSON (sem criar objetos Book)"""
+    snapshot = _snapshot
+    if not title:
+        return snapshot.books_json
+    rows = snapshot.book_rows_json
+    return join_json_array([rows[i] for i in _search_positions(snapshot, title)])
+
+
+def search_books_page_json(title: Optional[str], after_id: int, limit: int) -> Tuple[bytes, Optional[int]]:
+    """Busca uma página de livros por título a partir do ID after_id, em JSON
+
+    Retorna o JSON da página e o ID do último livro dela, ou None se não há mais resultados.
+    """
+    snapshot = _snapshot
+
+    # Busca um a mais para saber se existe próxima página
     if not title:
-        return get_all_books()
+        positions = list(range(after_id, min(after_id + limit + 1, len(snapshot.book_rows_json))))
+    else:
+        positions = find_substring(
+            snapshot.title_trigrams, snapshot.titles_lower, title.lower(),
+            start=after_id, limit=limit + 1,
+        )
+
+    has_more = len(positions) > limit
+    positions = positions[:limit]
+    rows = snapshot.book_rows_json
+    # A posição de um livro é o id - 1
+    return join_json_array([rows[i] for i in positions]), (positions[-1] + 1 if has_more else None)
+
+
+def autocomplete_json(prefix: str, limit: int) -> bytes:
+    """Até `limit` livros cujo título começa com `prefix`, em JSON [{"id", "title"}]
+
+    Ordenados por rating (maior primeiro) e depois por título.
+    """
+    snapshot = _snapshot
+    positions = find_prefix(
+        snapshot.titles_lower, snapshot.title_order, snapshot.rating_keys, prefix.lower(), limit,
+    )
+    rows = snapshot.books_data
+    return dump_json([{'id': position + 1, 'title': rows[position]['title']} for position in positions])
+
+
+def rank_books_json(query: str, min_score: float = 0.0) -> bytes:
+    """Todos os livros que casam com a consulta, do mais relevante ao menos, em JSON"""
+    snapshot = _snapshot
+    rows = snapshot.book_rows_json
+    results = snapshot.text_index.search(query, min_score=min_score)
+    return join_json_array([rows[position] for _, position in results])
+
+
+def rank_books_page_json(
+    query: str,
+    limit: int,
+    min_score: float = 0.0,
+    after: Optional[Tuple[float, int]] = None,
+) -> Tuple[bytes, Optional[Tuple[float, int]]]:
+    """Retorna uma página (em JSON) da busca por relevância (BM25, com tolerância a erros)
+
+    `after` é a (pontuação, id) do último livro da página anterior. Retorna
+    também a (pontuação, id) do último livro desta página, ou None se não há
+    mais resultados.
+    """
+    snapshot = _snapshot
+    last = None if after is None else (after[0], after[1] - 1)
+    # Busca um a mais para saber se existe próxima página
+    results = snapshot.text_index.search(query, limit + 1, min_score, last)
+    has_more = len(results) > limit
+    results = results[:limit]
+    rows = snapshot.book_rows_json
+    content = join_json_array([rows[position] for _, position in results])
+    if not has_more:
+        return content, None
+    score, position = results[-1]
+    return content, (score, position + 1)
+
+
+def iter_books_ndjson(
+    title: Optional[str] = None,
+    query: Optional[str] = None,
+    min_score: float = 0.0,
+) -> Iterator[bytes]:
+    """Gera o catálogo (ou o resultado da busca por título ou por relevância) em NDJSON, aos pedaços
+
+    Reaproveita o JSON de cada livro gerado na carga, então a memória
+    usada não depende do tamanho do catálogo. Com `query`, os livros saem
+    na ordem de rank_books_json.
+    """
+    # Fixa o snapshot agora: uma recarga no meio do envio não mistura versões
+    snapshot = _snapshot
+    if query is not None:
+        results = snapshot.text_index.search(query, min_score=min_score)
+        positions = (position for _, position in results)
+    elif title:
+        positions = iter_substring(snapshot.title_trigrams, snapshot.titles_lower, title.lower())
+    else:
+        positions = iter(range(len(snapshot.book_rows_json)))
+    return _ndjson_batches(snapshot.book_rows_json, positions)
+
+
+def _ndjson_batches(rows: List[bytes], positions: Iterator[int]) -> Iterator[bytes]:
+    """Agrupa as linhas JSON das posições em pedaços de STREAM_BATCH_SIZE linhas"""
+    while True:
+        batch = [rows[i] for i in islice(positions, STREAM_BATCH_SIZE)]
+        if not batch:
+            break
+        yield b'\n'.join(batch) + b'\n'
+
+
+def _keyset_start(order: array, keys: array, lo: int, last: Optional[Tuple[float, int]]) -> int:
+    """Acha onde a próxima página começa em uma ordenação (chave, id) já pré-calculada"""
+    if last is None:
+        return lo
+
+    # Dentro do bloco com a mesma chave, as posições estão em ordem crescente de id
+    key, last_id = last
+    start = bisect_left(keys, key, lo)
+    end = bisect_right(keys, key, start)
+    return max(lo, bisect_right(order, last_id - 1, start, end))
+
+
+def _page_from_order(
+    rows: Sequence[bytes], order: array, keys: array, start: int, end: int, limit: int,
+) -> Tuple[bytes, Optional[Tuple[float, int]]]:
+    """Corta uma página de uma ordenação e retorna o JSON dela e a chave do último livro"""
+    stop = min(end, start + limit)
+    positions = order[start:stop]
+    content = join_json_array([rows[i] for i in positions])
+    if stop >= end or not positions:
+        return content, None
+    return content, (keys[stop - 1], positions[-1] + 1)
+
+
+def get_books_by_price_range_json(
+    min_price: Optional[float],
+    max_price: Optional[float],
+    limit: int,
+    after: Optional[Tuple[float, int]] = None,
+) -> Tuple[bytes, Optional[Tuple[float, int]]]:
+    """Retorna uma página (em JSON) de livros com min_price <= preço <= max_price, ordenados por preço
+
+    Usa busca binária na coluna de preços ordenada; `after` é o (preço, id)
+    do último livro da página anterior. Retorna também o (preço, id) do
+    último livro desta página, ou None se não há mais resultados.
+    """
+    snapshot = _snapshot
+    keys = snapshot.price_keys
+    lo = 0 if min_price is None else bisect_left(keys, min_price)
+    hi = len(keys) if max_price is None else bisect_right(keys, max_price)
+    start = _keyset_start(snapshot.price_order, keys, lo, after)
+    return _page_from_order(snapshot.book_rows_json, snapshot.price_order, keys, start, hi, limit)
+
 
-    # Filtra livros cujo título contém o termo buscado
-    results = []
-    for book in books_data:
-        if title.lower() in book['title'].lower():
-            results.append(Book(**book))
+def get_top_rated_books_json(
+    min_rating: int,
+    limit: int,
+    after: Optional[Tuple[int, int]] = None,
+) -> Tuple[bytes, Optional[Tuple[int, int]]]:
+    """Retorna uma página (em JSON) de livros com rating >= min_rating, do maior para o menor rating
 
-    return results
+    `after` é o (rating, id) do último livro da página anterior. Retorna também
+    o (rating, id) do último livro desta página, ou None se não há mais resultados.
+    """
+    snapshot = _snapshot
+    keys = snapshot.rating_keys
+    hi = bisect_right(keys, -min_rating)
+    negated = None if after is None else (-after[0], after[1])
+    start = _keyset_start(snapshot.rating_order, keys, 0, negated)
+    content, last = _page_from_order(snapshot.book_rows_json, snapshot.rating_order, keys, start, hi, limit)
+    return content, (None if last is None else (-last[0], last[1]))
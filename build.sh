@@ -17,4 +17,7 @@ if [ ! -f data/books.csv ]; then
 fi
 
 echo "CSV encontrado com $(wc -l < data/books.csv) linhas"
+
+echo "Gerando catálogo binário..."
+python scripts/build_snapshot.py data/books.csv
 echo "Build concluído!"
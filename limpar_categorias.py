@@ -1,4 +1,8 @@
 import csv
+import os
+import sys
+import tempfile
+from itertools import islice
 
 # Categorias válidas de livros
 VALID_CATEGORIES = {
@@ -14,41 +18,109 @@ VALID_CATEGORIES = {
     'Short Stories', 'Adult Fiction', 'Historical', 'Default'
 }
 
-def clean_csv():
-    """Limpa categorias inválidas do CSV"""
-    books = []
+FIELDNAMES = ['title', 'price', 'rating', 'availability', 'category', 'image_url']
 
-    # Ler CSV
-    with open('data/books.csv', 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            # Limpar categoria
-            category = row['category'].strip()
+# Linhas processadas por vez: a memória depende deste valor, não do tamanho do CSV
+CHUNK_SIZE = 10_000
 
-            # Se não é válida, marcar como Unknown
-            if category not in VALID_CATEGORIES:
-                row['category'] = 'Unknown'
+def read_chunks(file, chunk_size=CHUNK_SIZE):
+    """Lê o CSV em blocos de até chunk_size linhas"""
+    reader = csv.DictReader(file)
+    while True:
+        chunk = list(islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
 
-            books.append(row)
 
-    # Escrever CSV limpo
-    with open('data/books.csv', 'w', newline='', encoding='utf-8') as file:
-        fieldnames = ['title', 'price', 'rating', 'availability', 'category', 'image_url']
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(books)
+def clean_category(row, stats):
+    """Marca como Unknown as categorias fora de VALID_CATEGORIES"""
+    category = (row.get('category') or '').strip()
+    if category not in VALID_CATEGORIES:
+        if category != 'Unknown':
+            stats['invalid_categories'] += 1
+        category = 'Unknown'
+    row['category'] = category
 
-    # Estatísticas
-    categories = {}
-    for book in books:
-        cat = book['category']
-        categories[cat] = categories.get(cat, 0) + 1
 
+def clean_price(row, stats):
+    """Preço inválido vira 0.0, como no carregamento da API"""
+    price = (row.get('price') or '').strip()
+    try:
+        float(price)
+    except ValueError:
+        stats['invalid_prices'] += 1
+        price = '0.0'
+    row['price'] = price
+
+
+def clean_rating(row, stats):
+    """Rating inválido vira 0, como no carregamento da API"""
+    rating = (row.get('rating') or '').strip()
+    try:
+        int(rating)
+    except ValueError:
+        stats['invalid_ratings'] += 1
+        rating = '0'
+    row['rating'] = rating
+
+
+# Etapas aplicadas em ordem a cada linha
+STAGES = (clean_category, clean_price, clean_rating)
+
+
+def clean_rows(chunks, stats, stages=STAGES):
+    """Aplica as etapas de limpeza bloco a bloco e conta as categorias"""
+    categories = stats['categories']
+    for chunk in chunks:
+        for row in chunk:
+            for stage in stages:
+                stage(row, stats)
+            categories[row['category']] = categories.get(row['category'], 0) + 1
+        stats['total'] += len(chunk)
+        yield chunk
+
+
+def clean_csv(filepath='data/books.csv'):
+    """Limpa categorias inválidas do CSV
+
+    O arquivo é lido, limpo e escrito em blocos, então a memória usada não
+    cresce com o tamanho do catálogo. A saída vai para um arquivo temporário
+    no mesmo diretório, que só substitui o original (os.replace) depois de
+    completo e gravado em disco: uma falha no meio deixa o CSV intacto.
+    """
+    stats = {
+        'total': 0, 'invalid_categories': 0, 'invalid_prices': 0,
+        'invalid_ratings': 0, 'categories': {},
+    }
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix='.books-', suffix='.csv.tmp', dir=directory)
+    try:
+        with open(filepath, 'r', encoding='utf-8', newline='') as source, \
+                os.fdopen(fd, 'w', newline='', encoding='utf-8') as target:
+            writer = csv.DictWriter(target, fieldnames=FIELDNAMES, extrasaction='ignore')
+            writer.writeheader()
+            for chunk in clean_rows(read_chunks(source), stats):
+                writer.writerows(chunk)
+            target.flush()
+            os.fsync(target.fileno())
+        # mkstemp cria o arquivo com permissão 0600; mantém a do original
+        os.chmod(tmp_path, os.stat(filepath).st_mode & 0o777)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    categories = stats['categories']
     print(f"✅ CSV limpo!")
-    print(f"Total de livros: {len(books)}")
+    print(f"Total de livros: {stats['total']}")
+    print(f"Corrigidos: {stats['invalid_categories']} categorias, "
+          f"{stats['invalid_prices']} preços, {stats['invalid_ratings']} ratings")
     print(f"\nCategorias encontradas ({len(categories)}):")
     for cat, count in sorted(categories.items(), key=lambda x: -x[1]):
         print(f"  {cat}: {count}")
+    return stats
 
 if __name__ == "__main__":
-    clean_csv()
+    clean_csv(*sys.argv[1:2])
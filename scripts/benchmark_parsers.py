@@ -0,0 +1,123 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+# Permite importar extractors.py rodando o script da raiz do projeto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from extractors import available_extractors, get_extractor
+from fixture_site import FIXTURE_DIR
+
+SITE_ROOT = "https://books.toscrape.com/"
+
+# Por padrão usa as páginas salvas no repositório (scripts/fixtures/site); o
+# cache HTTP do scraper (.scraper_cache/http) também pode ser passado
+DEFAULT_FIXTURES = FIXTURE_DIR
+
+
+def load_fixtures(directory):
+    """Lê as páginas HTML salvas e separa em listagens e páginas de livro"""
+    listings, details = [], []
+    patterns = ('**/*.html', '**/*.body')
+    paths = sorted(p for pattern in patterns for p in glob.glob(os.path.join(directory, pattern), recursive=True))
+
+    for path in paths:
+        with open(path, 'rb') as file:
+            html = file.read()
+        if b'product_pod' in html:
+            listings.append(html)
+        elif b'breadcrumb' in html:
+            details.append(html)
+
+    return listings, details
+
+
+def run_backend(extractor, listings, details):
+    """Extrai todas as páginas uma vez e retorna os resultados"""
+    listing_results = [
+        (extractor.parse_listing_page(html, SITE_ROOT), extractor.parse_page_count(html))
+        for html in listings
+    ]
+    detail_results = [extractor.parse_book_category(html) for html in details]
+    return listing_results, detail_results
+
+
+def time_pages(function, pages, min_time):
+    """Roda `function` em todas as páginas até passar de min_time segundos; retorna páginas/s"""
+    if not pages:
+        return None
+
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for html in pages:
+            function(html)
+        done += len(pages)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return done / elapsed
+
+
+def benchmark(directory=DEFAULT_FIXTURES, backends=None, min_time=1.0):
+    """Mede páginas por segundo de cada backend e confere se todos extraem o mesmo"""
+    listings, details = load_fixtures(directory)
+    if not listings and not details:
+        raise SystemExit(f"Nenhuma página HTML encontrada em {directory}")
+
+    backends = backends or available_extractors()
+    reference = None
+    results = {}
+
+    for name in backends:
+        extractor = get_extractor(name)
+
+        # Todos os backends precisam gerar exatamente os mesmos campos
+        output = run_backend(extractor, listings, details)
+        if reference is None:
+            reference = output
+        elif output != reference:
+            raise SystemExit(f"Backend {name} extraiu dados diferentes de {backends[0]}")
+
+        results[name] = {
+            'listing_pages_per_sec': time_pages(
+                lambda html: extractor.parse_listing_page(html, SITE_ROOT), listings, min_time),
+            'detail_pages_per_sec': time_pages(extractor.parse_book_category, details, min_time),
+        }
+
+    return {
+        'fixtures': {'listing_pages': len(listings), 'detail_pages': len(details)},
+        'backends': results,
+    }
+
+
+def print_report(report):
+    """Mostra o resultado em tabela"""
+    fixtures = report['fixtures']
+    print(f"Páginas: {fixtures['listing_pages']} listagens, {fixtures['detail_pages']} de livros\n")
+    print(f"{'backend':<10}{'listagens/s':>14}{'livros/s':>14}")
+    for name, result in report['backends'].items():
+        listing = result['listing_pages_per_sec']
+        detail = result['detail_pages_per_sec']
+        print(f"{name:<10}{listing or 0:>14.1f}{detail or 0:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de extração de HTML do scraper")
+    parser.add_argument('fixtures', nargs='?', default=DEFAULT_FIXTURES,
+                        help="diretório com páginas HTML salvas (*.html ou *.body do cache; "
+                             "padrão: scripts/fixtures/site)")
+    parser.add_argument('--backend', action='append', choices=available_extractors(),
+                        help="backend a medir (pode repetir; padrão: todos disponíveis)")
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="segundos mínimos de medição por backend e tipo de página")
+    parser.add_argument('--json', action='store_true', help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    report = benchmark(args.fixtures, args.backend, args.min_time)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,195 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Permite importar o pacote api/ e o gerador rodando o script da raiz do projeto
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api import services
+from api.catalog import build_category_stats
+from generate_catalog import DEFAULT_SEED, parse_size, write_catalog
+
+# Catálogos gerados ficam aqui e são reaproveitados entre execuções
+DEFAULT_CACHE_DIR = '.benchmark_cache'
+
+DEFAULT_SIZES = ('1k', '100k')
+
+# Consultas de busca: curta (varredura), comum, rara e sem resultado
+SEARCH_QUERIES = {
+    'search_short': 'th',
+    'search_common': 'the',
+    'search_rare': 'symphony',
+    'search_miss': 'zzzz',
+}
+
+
+def catalog_path(cache_dir, size, seed):
+    """Gera o catálogo sintético se ainda não existir no cache e retorna o caminho"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'catalog-{size.lower()}-{seed}.csv')
+    if not os.path.exists(path):
+        write_catalog(path, parse_size(size), seed)
+    return path
+
+
+def measure(function, min_time, max_runs=None):
+    """Roda `function` até passar de min_time segundos e retorna as estatísticas
+
+    Sempre roda pelo menos uma vez; max_runs limita operações caras
+    (como a carga do CSV) em catálogos grandes.
+    """
+    timings = []
+    start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - t0)
+        if time.perf_counter() - start >= min_time or (max_runs and len(timings) >= max_runs):
+            break
+
+    timings.sort()
+    return {
+        'runs': len(timings),
+        'min_ms': timings[0] * 1000,
+        'median_ms': timings[len(timings) // 2] * 1000,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'ops_per_sec': len(timings) / sum(timings),
+    }
+
+
+def benchmark_catalog(path, min_time, seed=DEFAULT_SEED):
+    """Mede cada função da camada de serviço sobre um catálogo"""
+    results = {}
+
+    def load():
+        # load_books_from_csv imprime o resumo da carga; fica fora do relatório
+        with contextlib.redirect_stdout(io.StringIO()):
+            services.load_books_from_csv(path, use_mmap=False)
+
+    results['load_books_from_csv'] = measure(load, min_time, max_runs=5)
+    snapshot = services.get_snapshot()
+    total = len(snapshot.books_by_id)
+
+    results['get_all_books'] = measure(services.get_all_books, min_time)
+
+    # IDs sorteados com semente fixa, os mesmos em toda execução
+    rng = random.Random(seed)
+    ids = [rng.randint(1, total) for _ in range(1000)] if total else [1]
+    results['get_book_by_id'] = measure(lambda: [services.get_book_by_id(i) for i in ids], min_time)
+    results['get_book_by_id']['batch'] = len(ids)
+
+    for name, query in SEARCH_QUERIES.items():
+        results[name] = measure(lambda: services.search_books(query), min_time)
+        results[name]['query'] = query
+        results[name]['matches'] = len(services.search_books(query))
+
+    # /api/v1/categories lê o resumo pré-calculado; a agregação em si roda na carga
+    results['list_categories'] = measure(services.get_categories, min_time)
+    results['category_aggregation'] = measure(
+        lambda: build_category_stats(
+            snapshot.category_names, snapshot.category_codes,
+            snapshot.prices, snapshot.ratings, snapshot.dataset_version,
+        ),
+        min_time,
+    )
+
+    return {'rows': total, 'csv_bytes': os.path.getsize(path), 'results': results}
+
+
+def git_commit():
+    """Commit atual, para comparar resultados entre versões"""
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        )
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(sizes=DEFAULT_SIZES, min_time=1.0, seed=DEFAULT_SEED, cache_dir=DEFAULT_CACHE_DIR):
+    """Roda o benchmark em cada tamanho de catálogo"""
+    catalogs = {}
+    for size in sizes:
+        path = catalog_path(cache_dir, size, seed)
+        catalogs[size] = benchmark_catalog(path, min_time, seed)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'min_time': min_time,
+        # Pico de memória do processo (ru_maxrss é em KB no Linux)
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'catalogs': catalogs,
+    }
+
+
+def print_report(report):
+    """Mostra o resultado em tabela"""
+    print(f"Commit {report['commit'] or '?'} — Python {report['python']}\n")
+    for size, catalog in report['catalogs'].items():
+        print(f"Catálogo {size} ({catalog['rows']} livros)")
+        print(f"  {'função':<24}{'mediana (ms)':>14}{'ops/s':>14}")
+        for name, result in catalog['results'].items():
+            print(f"  {name:<24}{result['median_ms']:>14.3f}{result['ops_per_sec']:>14.1f}")
+        print()
+
+
+def print_comparison(report, baseline):
+    """Compara as medianas com um resultado salvo (ex: de outro commit)"""
+    print(f"Comparação com {baseline.get('commit') or 'baseline'} (mediana; >1.00 = mais lento)\n")
+    for size, catalog in report['catalogs'].items():
+        previous = baseline.get('catalogs', {}).get(size)
+        if previous is None:
+            continue
+        print(f"Catálogo {size}")
+        for name, result in catalog['results'].items():
+            before = previous['results'].get(name)
+            if before is None:
+                continue
+            ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+            print(f"  {name:<24}{before['median_ms']:>12.3f} ->{result['median_ms']:>12.3f} ms{ratio:>8.2f}x")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da camada de serviço sobre catálogos sintéticos")
+    parser.add_argument('--size', action='append',
+                        help="tamanho do catálogo: 1k, 100k, 1m, 10m ou número de linhas "
+                             "(pode repetir; padrão: 1k e 100k)")
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="segundos mínimos de medição por função")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="semente do catálogo sintético")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help="onde guardar os catálogos gerados (padrão: .benchmark_cache)")
+    parser.add_argument('--json', action='store_true', help="imprime o resultado em JSON")
+    parser.add_argument('--output', help="também grava o JSON neste arquivo")
+    parser.add_argument('--compare', help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    report = benchmark(args.size or DEFAULT_SIZES, args.min_time, args.seed, args.cache_dir)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            print_comparison(report, json.load(file))
@@ -0,0 +1,23 @@
+import os
+import sys
+import time
+
+# Permite importar o pacote api/ rodando o script da raiz do projeto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.catalog import write_binary_snapshot
+
+
+def build_snapshot(csv_path='data/books.csv'):
+    """Gera o catálogo binário (books.bin) ao lado do CSV para a API iniciar mais rápido"""
+    start = time.perf_counter()
+    binary_path = write_binary_snapshot(csv_path)
+    elapsed = time.perf_counter() - start
+
+    size_kb = os.path.getsize(binary_path) / 1024
+    print(f"Catálogo binário salvo em {binary_path} ({size_kb:.1f} KB, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    # Uso: python scripts/build_snapshot.py [caminho/do/books.csv]
+    build_snapshot(*sys.argv[1:2])
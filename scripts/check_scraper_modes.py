@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+# Permite importar o scraper e a fixture rodando o script da raiz do projeto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scraper
+from extractors import available_extractors
+from fixture_site import FIXTURE_DIR, serve_fixture_site
+
+
+def run_mode(mode, site_root, cache_dir=None):
+    """Roda um modo do scraper contra o site local e retorna os bytes do CSV gerado
+
+    Com `cache_dir`, usa o cache HTTP (e os GETs condicionais) desse diretório.
+    """
+    cache = scraper.HttpCache(cache_dir) if cache_dir else None
+    # O scraper imprime o progresso livro a livro; fica fora do relatório
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'sequential':
+            books = scraper.scrape_books(cache, site_root=site_root)
+        elif mode == 'async':
+            books = asyncio.run(scraper.scrape_books_async(site_root, rate_limit=0, cache=cache))
+        else:
+            books = asyncio.run(scraper.scrape_books_by_category_async(site_root, rate_limit=0, cache=cache))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'{mode}.csv')
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper.save_to_csv(books, path)
+        with open(path, 'rb') as file:
+            return file.read()
+
+
+def check(directory=FIXTURE_DIR, parser=None):
+    """Confere se os modos assíncrono e por categorias geram o mesmo CSV do sequencial
+
+    Cada modo roda sem cache e, no caso dos concorrentes, também com o cache
+    HTTP já preenchido (todas as páginas voltando como 304). Retorna a lista
+    de divergências (vazia se todos os CSVs são idênticos byte a byte).
+    """
+    if parser:
+        scraper.set_extractor(parser)
+
+    with serve_fixture_site(directory) as site_root, tempfile.TemporaryDirectory() as cache_dir:
+        print(f"Site local em {site_root}")
+        reference = run_mode('sequential', site_root)
+        rows = reference.count(b'\n') - 1
+        print(f"  {'sequential':<28}{rows} livros, {len(reference)} bytes")
+
+        failures = []
+        runs = [
+            ('async', None),
+            ('by_category', None),
+            ('async', cache_dir),  # preenche o cache
+            ('async', cache_dir),  # tudo 304
+            ('by_category', cache_dir),
+        ]
+        for mode, cache in runs:
+            label = mode + (' (cache)' if cache else '')
+            output = run_mode(mode, site_root, cache)
+            same = output == reference
+            print(f"  {label:<28}{'idêntico' if same else 'DIFERENTE'}")
+            if not same:
+                failures.append(label)
+        return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Confere se todos os modos do scraper geram o mesmo CSV sobre as páginas de fixture")
+    parser.add_argument('fixtures', nargs='?', default=FIXTURE_DIR,
+                        help="diretório do site local (padrão: scripts/fixtures/site)")
+    parser.add_argument('--parser', choices=available_extractors(),
+                        help="backend de extração de HTML (padrão: o mais rápido disponível)")
+    args = parser.parse_args()
+
+    failures = check(args.fixtures, args.parser)
+    if failures:
+        raise SystemExit(f"CSV diferente do modo sequencial: {', '.join(failures)}")
+    print("Todos os modos geram o mesmo CSV")
@@ -0,0 +1,187 @@
+import re
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+# lxml é opcional: sem ele, só o backend "bs4" fica disponível
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+RATING_MAP = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
+PAGE_COUNT_RE = re.compile(r'of\s+(\d+)')
+
+
+def book_page_url(href, site_root, page_url=None):
+    """URL absoluta da página do livro a partir do link na listagem"""
+    if page_url:
+        return urljoin(page_url, href)
+    return site_root + "catalogue/" + href
+
+
+class Bs4Extractor:
+    """Extração com BeautifulSoup + html.parser (Python puro, o backend original)"""
+    name = 'bs4'
+
+    def parse_listing_page(self, html, site_root, page_url=None):
+        """Extrai os livros de uma página de listagem
+
+        Retorna uma lista de (dados do livro sem categoria, URL da página do livro).
+        Com `page_url`, os links dos livros são resolvidos a partir dela
+        (necessário nas listagens de categoria, que usam "../../../").
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        results = []
+
+        # Encontra todos os livros na página
+        for book in soup.find_all('article', class_='product_pod'):
+            # Extrai título
+            title = book.h3.a['title']
+
+            # Extrai preço (remove o símbolo £)
+            price = book.find('p', class_='price_color').text.strip('£')
+
+            # Extrai rating (converte texto para número)
+            rating_class = book.find('p', class_='star-rating')['class'][1]
+            rating = RATING_MAP.get(rating_class, 0)
+
+            # Extrai disponibilidade
+            availability = book.find('p', class_='instock availability').text.strip()
+
+            # Extrai URL da imagem
+            image_url = site_root + book.find('img')['src'].replace('../', '')
+
+            # Extrai URL do livro para buscar categoria
+            book_url = book_page_url(book.h3.a['href'], site_root, page_url)
+
+            book_data = {
+                'title': title,
+                'price': price,
+                'rating': rating,
+                'availability': availability,
+                'image_url': image_url,
+            }
+            results.append((book_data, book_url))
+
+        return results
+
+    def parse_page_count(self, html):
+        """Lê o total de páginas do texto "Page 1 of 50" (None se não encontrar)"""
+        soup = BeautifulSoup(html, 'html.parser')
+        current = soup.find('li', class_='current')
+        if current:
+            match = PAGE_COUNT_RE.search(current.text)
+            if match:
+                return int(match.group(1))
+        return None
+
+    def parse_category_links(self, html):
+        """Lista (nome, link) das categorias no menu lateral"""
+        soup = BeautifulSoup(html, 'html.parser')
+        menu = soup.find('div', class_='side_categories')
+        if not menu:
+            return []
+        # O primeiro nível é "Books"; as categorias ficam na lista de dentro
+        return [(a.text.strip(), a['href']) for a in menu.select('ul > li > ul > li > a')]
+
+    def parse_book_category(self, html):
+        """Extrai a categoria do breadcrumb da página de um livro"""
+        soup = BeautifulSoup(html, 'html.parser')
+        # A categoria está no breadcrumb
+        breadcrumb = soup.find('ul', class_='breadcrumb')
+        if breadcrumb:
+            # Pega o penúltimo item (último é o título do livro)
+            category_link = breadcrumb.find_all('a')
+            if len(category_link) >= 3:
+                return category_link[2].text.strip()
+        return "Unknown"
+
+
+def _has_class(name):
+    """Expressão XPath que testa se o elemento tem a classe CSS `name`"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlExtractor:
+    """Extração com lxml (parser em C) e XPath; gera os mesmos campos do Bs4Extractor"""
+    name = 'lxml'
+
+    # Mesmas regras de busca do backend bs4, em XPath
+    BOOKS = f".//article[{_has_class('product_pod')}]"
+    TITLE_LINK = './/h3//a'
+    PRICE = f".//p[{_has_class('price_color')}]"
+    RATING = f".//p[{_has_class('star-rating')}]"
+    AVAILABILITY = ".//p[@class='instock availability']"
+    IMAGE = './/img'
+    CURRENT_PAGE = f".//li[{_has_class('current')}]"
+    BREADCRUMB_LINKS = f"(.//ul[{_has_class('breadcrumb')}])[1]//a"
+    CATEGORY_LINKS = f"(.//div[{_has_class('side_categories')}])[1]//ul/li/ul/li/a"
+
+    def __init__(self):
+        if lxml is None:
+            raise RuntimeError("Backend lxml indisponível: instale com pip install lxml")
+        self.parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def _parse(self, html):
+        if isinstance(html, str):
+            html = html.encode('utf-8')
+        return lxml.html.document_fromstring(html, parser=self.parser)
+
+    def parse_listing_page(self, html, site_root, page_url=None):
+        """Extrai os livros de uma página de listagem (mesmo retorno do backend bs4)"""
+        results = []
+        for book in self._parse(html).xpath(self.BOOKS):
+            link = book.xpath(self.TITLE_LINK)[0]
+            book_data = {
+                'title': link.get('title'),
+                'price': book.xpath(self.PRICE)[0].text_content().strip('£'),
+                'rating': RATING_MAP.get(book.xpath(self.RATING)[0].get('class').split()[1], 0),
+                'availability': book.xpath(self.AVAILABILITY)[0].text_content().strip(),
+                'image_url': site_root + book.xpath(self.IMAGE)[0].get('src').replace('../', ''),
+            }
+            results.append((book_data, book_page_url(link.get('href'), site_root, page_url)))
+        return results
+
+    def parse_page_count(self, html):
+        """Lê o total de páginas do texto "Page 1 of 50" (None se não encontrar)"""
+        current = self._parse(html).xpath(self.CURRENT_PAGE)
+        if current:
+            match = PAGE_COUNT_RE.search(current[0].text_content())
+            if match:
+                return int(match.group(1))
+        return None
+
+    def parse_category_links(self, html):
+        """Lista (nome, link) das categorias no menu lateral"""
+        return [(a.text_content().strip(), a.get('href')) for a in self._parse(html).xpath(self.CATEGORY_LINKS)]
+
+    def parse_book_category(self, html):
+        """Extrai a categoria do breadcrumb da página de um livro"""
+        links = self._parse(html).xpath(self.BREADCRUMB_LINKS)
+        if len(links) >= 3:
+            return links[2].text_content().strip()
+        return "Unknown"
+
+
+EXTRACTORS = {
+    Bs4Extractor.name: Bs4Extractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def available_extractors():
+    """Nomes dos backends que podem ser usados neste ambiente"""
+    return [name for name in EXTRACTORS if name != 'lxml' or lxml is not None]
+
+
+def default_extractor_name():
+    """Backend mais rápido disponível"""
+    return 'lxml' if lxml is not None else 'bs4'
+
+
+def get_extractor(name=None):
+    """Cria o backend de extração pelo nome (padrão: o mais rápido disponível)"""
+    name = name or default_extractor_name()
+    if name not in EXTRACTORS:
+        raise ValueError(f"Backend de extração desconhecido: {name} (opções: {', '.join(EXTRACTORS)})")
+    return EXTRACTORS[name]()
@@ -0,0 +1,203 @@
+import argparse
+import contextlib
+import csv
+import functools
+import os
+import re
+import threading
+from collections import defaultdict
+from html import escape
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Cópia local (reduzida) do books.toscrape.com: listagens do catálogo, listagens
+# de cada categoria e a página de cada livro, com a mesma estrutura de HTML e de
+# URLs do site. Serve de entrada para o benchmark dos extratores e para rodar o
+# scraper sem depender da rede.
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'site')
+
+# Livros por página de listagem, como no site
+PAGE_SIZE = 20
+
+# Páginas do catálogo geradas por padrão: 120 livros, o bastante para uma
+# categoria passar de uma página (Sequential Art tem 21)
+DEFAULT_PAGES = 6
+
+RATING_NAMES = {1: 'One', 2: 'Two', 3: 'Three', 4: 'Four', 5: 'Five'}
+
+IMAGE_PREFIX = 'https://books.toscrape.com/'
+
+
+def slugify(text):
+    """Trecho de URL no formato do site (ex: "A Light in the Attic" -> "a-light-in-the-attic")"""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def _page(title, breadcrumb, body):
+    """Documento HTML com o esqueleto comum às páginas do site"""
+    return (
+        '<!DOCTYPE html>\n<html lang="en-us" class="no-js">\n<head>\n'
+        f'<title>{escape(title)} | Books to Scrape - Sandbox</title>\n<meta charset="utf-8">\n</head>\n'
+        '<body id="default" class="default">\n<div class="container-fluid page"><div class="page_inner">\n'
+        f'<ul class="breadcrumb">\n{breadcrumb}</ul>\n{body}</div></div>\n</body>\n</html>\n'
+    )
+
+
+def _product_pod(book, root):
+    """Card de um livro na listagem; `root` leva da página até catalogue/"""
+    title = escape(book['title'])
+    short = escape(book['title'] if len(book['title']) <= 40 else book['title'][:37] + '...')
+    image = '../' * (root.count('../') + 1) + book['image_url'][len(IMAGE_PREFIX):]
+    href = root + book['slug'] + '/index.html'
+    return (
+        '<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3"><article class="product_pod">\n'
+        f'<div class="image_container"><a href="{href}"><img src="{image}" alt="{title}" class="thumbnail"></a></div>\n'
+        f'<p class="star-rating {RATING_NAMES[int(book["rating"])]}"><i class="icon-star"></i></p>\n'
+        f'<h3><a href="{href}" title="{title}">{short}</a></h3>\n'
+        f'<div class="product_price"><p class="price_color">£{book["price"]}</p>\n'
+        f'<p class="instock availability"><i class="icon-ok"></i>{escape(book["availability"])}</p></div>\n'
+        '</article></li>\n'
+    )
+
+
+def _listing(title, breadcrumb, menu, books, root, page, page_count):
+    """Página de listagem com o menu de categorias, os livros e o paginador"""
+    pods = ''.join(_product_pod(book, root) for book in books)
+    pager = ''
+    if page_count > 1:
+        pager = f'<ul class="pager"><li class="current">Page {page} of {page_count}</li>'
+        if page < page_count:
+            pager += f'<li class="next"><a href="page-{page + 1}.html">next</a></li>'
+        pager += '</ul>\n'
+    body = (
+        f'<div class="row">\n<aside class="sidebar col-sm-4 col-md-3 col-lg-3">{menu}</aside>\n'
+        f'<div class="col-sm-8 col-md-9"><section>\n<ol class="row">\n{pods}</ol>\n{pager}</section></div>\n</div>\n'
+    )
+    return _page(title, breadcrumb, body)
+
+
+def _write(directory, path, html):
+    path = os.path.join(directory, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='\n') as file:
+        file.write(html)
+
+
+def write_fixture_site(csv_path='data/books.csv', directory=FIXTURE_DIR, pages=DEFAULT_PAGES):
+    """Gera as páginas do site a partir dos primeiros livros do CSV
+
+    Retorna quantos livros foram incluídos.
+    """
+    with open(csv_path, 'r', encoding='utf-8') as file:
+        books = list(csv.DictReader(file))[:pages * PAGE_SIZE]
+
+    # IDs como os do site: o primeiro livro do catálogo é o 1000
+    for index, book in enumerate(books):
+        book['slug'] = f"{slugify(book['title'])}_{1000 - index}"
+
+    by_category = defaultdict(list)
+    for book in books:
+        by_category[book['category']].append(book)
+    category_slugs = {
+        name: f'{slugify(name)}_{number}' for number, name in enumerate(sorted(by_category), start=2)
+    }
+
+    def menu(root):
+        """Menu lateral de categorias; `root` leva da página até catalogue/"""
+        items = ''.join(
+            f'<li><a href="{root}category/books/{slug}/index.html">{escape(name)}</a></li>\n'
+            for name, slug in category_slugs.items()
+        )
+        return (
+            f'<div class="side_categories"><ul class="nav nav-list">\n'
+            f'<li><a href="{root}category/books_1/index.html">Books</a><ul>\n{items}</ul></li>\n</ul></div>'
+        )
+
+    # Catálogo geral: catalogue/page-N.html
+    page_count = (len(books) + PAGE_SIZE - 1) // PAGE_SIZE
+    breadcrumb = '<li><a href="../index.html">Home</a></li>\n<li class="active">All products</li>\n'
+    for page in range(1, page_count + 1):
+        chunk = books[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        html = _listing('All products', breadcrumb, menu(''), chunk, '', page, page_count)
+        _write(directory, f'catalogue/page-{page}.html', html)
+
+    # Listagens de cada categoria: catalogue/category/books/<slug>/index.html e page-N.html
+    root = '../../../'
+    for name, slug in category_slugs.items():
+        members = by_category[name]
+        count = (len(members) + PAGE_SIZE - 1) // PAGE_SIZE
+        breadcrumb = (
+            f'<li><a href="{root}../index.html">Home</a></li>\n'
+            f'<li><a href="../books_1/index.html">Books</a></li>\n<li class="active">{escape(name)}</li>\n'
+        )
+        for page in range(1, count + 1):
+            chunk = members[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            html = _listing(name, breadcrumb, menu(root), chunk, root, page, count)
+            filename = 'index.html' if page == 1 else f'page-{page}.html'
+            _write(directory, f'catalogue/category/books/{slug}/{filename}', html)
+
+    # Página de cada livro: catalogue/<slug>/index.html (a categoria vem do breadcrumb)
+    for book in books:
+        title = escape(book['title'])
+        breadcrumb = (
+            '<li><a href="../../index.html">Home</a></li>\n'
+            '<li><a href="../category/books_1/index.html">Books</a></li>\n'
+            f'<li><a href="../category/books/{category_slugs[book["category"]]}/index.html">'
+            f'{escape(book["category"])}</a></li>\n<li class="active">{title}</li>\n'
+        )
+        body = (
+            f'<article class="product_page"><div class="col-sm-6 product_main">\n<h1>{title}</h1>\n'
+            f'<p class="price_color">£{book["price"]}</p>\n'
+            f'<p class="instock availability"><i class="icon-ok"></i>{escape(book["availability"])}</p>\n'
+            '</div></article>\n'
+        )
+        _write(directory, f'catalogue/{book["slug"]}/index.html', _page(book['title'], breadcrumb, body))
+
+    return len(books)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """Serve os arquivos sem registrar cada requisição no terminal"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve_fixture_site(directory=FIXTURE_DIR, port=0):
+    """Serve as páginas em http://127.0.0.1:<port>/ numa thread, enquanto o bloco roda
+
+    Retorna a URL raiz, para passar ao scraper como site_root (port=0 escolhe
+    uma porta livre). O servidor manda Last-Modified e responde 304 aos GETs
+    condicionais, então o cache HTTP do scraper também é exercitado.
+    """
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}/'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera ou serve a cópia local do books.toscrape.com usada como fixture")
+    parser.add_argument('--csv', default='data/books.csv', help="CSV de onde vêm os livros")
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES, help="páginas do catálogo (20 livros cada)")
+    parser.add_argument('--output', default=FIXTURE_DIR, help="diretório das páginas geradas")
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help="em vez de gerar, serve as páginas nesta porta (ex: scraper.py --site http://127.0.0.1:PORT/)")
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        with serve_fixture_site(args.output, args.serve) as site_root:
+            print(f"Servindo {args.output} em {site_root} (Ctrl+C para parar)")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+    else:
+        total = write_fixture_site(args.csv, args.output, args.pages)
+        print(f"{total} livros gravados em {args.output}")
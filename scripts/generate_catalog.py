@@ -0,0 +1,92 @@
+import argparse
+import csv
+import hashlib
+import os
+import random
+import time
+
+FIELDNAMES = ['title', 'price', 'rating', 'availability', 'category', 'image_url']
+
+# Tamanhos nomeados aceitos em --rows
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+DEFAULT_SEED = 42
+
+# Categorias do books.toscrape.com
+CATEGORIES = (
+    'Academic', 'Adult Fiction', 'Art', 'Autobiography', 'Biography', 'Business',
+    'Childrens', 'Christian', 'Christian Fiction', 'Classics', 'Contemporary', 'Crime',
+    'Cultural', 'Default', 'Erotica', 'Fantasy', 'Fiction', 'Food and Drink', 'Health',
+    'Historical', 'Historical Fiction', 'History', 'Horror', 'Humor', 'Music', 'Mystery',
+    'New Adult', 'Nonfiction', 'Novels', 'Parenting', 'Philosophy', 'Poetry', 'Politics',
+    'Psychology', 'Religion', 'Romance', 'Science', 'Science Fiction', 'Self Help',
+    'Sequential Art', 'Short Stories', 'Spirituality', 'Sports and Games', 'Suspense',
+    'Thriller', 'Travel', 'Womens Fiction', 'Young Adult',
+)
+
+# Vocabulário dos títulos: palavras comuns e raras, para a busca ter
+# consultas com muitos e com poucos resultados
+TITLE_WORDS = (
+    'the', 'of', 'and', 'a', 'in', 'to', 'my', 'for', 'with', 'life', 'love', 'night',
+    'world', 'history', 'secret', 'house', 'city', 'dark', 'light', 'book', 'girl', 'man',
+    'story', 'war', 'king', 'queen', 'death', 'time', 'stars', 'heart', 'blood', 'water',
+    'mountain', 'river', 'garden', 'shadow', 'fire', 'winter', 'summer', 'journey', 'last',
+    'first', 'lost', 'little', 'great', 'wild', 'silent', 'golden', 'broken', 'hidden',
+    'python', 'algorithm', 'kingdom', 'empire', 'symphony', 'chronicles', 'murder', 'poems',
+    'recipes', 'guide', 'memoir', 'mystery', 'dragon', 'ocean', 'island', 'forest', 'sky',
+)
+
+
+def parse_size(value):
+    """Aceita '1k', '100k', '1m', '10m' ou um número de linhas"""
+    value = value.lower().replace('_', '')
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def generate_rows(rows, seed=DEFAULT_SEED):
+    """Gera as linhas do catálogo sintético
+
+    Mesma semente e mesmo número de linhas geram sempre o mesmo conteúdo,
+    e as primeiras N linhas de um catálogo maior são iguais às de um menor.
+    """
+    rng = random.Random(seed)
+    for i in range(rows):
+        words = rng.choices(TITLE_WORDS, k=rng.randint(2, 7))
+        title = ' '.join(words).capitalize() + f' {i + 1}'
+        digest = hashlib.md5(f'{seed}:{i}'.encode()).hexdigest()
+        yield (
+            title,
+            f'{rng.uniform(10.0, 60.0):.2f}',
+            rng.randint(1, 5),
+            'In stock',
+            rng.choice(CATEGORIES),
+            f'https://books.toscrape.com/media/cache/{digest[:2]}/{digest[2:4]}/{digest}.jpg',
+        )
+
+
+def write_catalog(path, rows, seed=DEFAULT_SEED):
+    """Escreve um CSV compatível com data/books.csv (via arquivo temporário)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDNAMES)
+        writer.writerows(generate_rows(rows, seed))
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um catálogo sintético no formato de data/books.csv")
+    parser.add_argument('--rows', default='1k', help="1k, 100k, 1m, 10m ou um número de linhas (padrão: 1k)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="semente do gerador (padrão: 42)")
+    parser.add_argument('--output', help="arquivo de saída (padrão: data/synthetic-<rows>.csv)")
+    args = parser.parse_args()
+
+    rows = parse_size(args.rows)
+    output = args.output or os.path.join('data', f'synthetic-{args.rows.lower()}.csv')
+
+    start = time.perf_counter()
+    write_catalog(output, rows, args.seed)
+    print(f"✓ {rows} livros gravados em {output} em {time.perf_counter() - start:.1f}s")
@@ -1,116 +1,545 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
 import requests
-from bs4 import BeautifulSoup
+import httpx
+from urllib.parse import urljoin, urlsplit
 import csv
 import time
+from extractors import available_extractors, default_extractor_name, get_extractor
 
 # URL base do site
-BASE_URL = "https://books.toscrape.com/catalogue/page-{}.html"
-SITE_BASE = "https://books.toscrape.com/catalogue/"
+SITE_ROOT = "https://books.toscrape.com/"
+BASE_URL = SITE_ROOT + "catalogue/page-{}.html"
+SITE_BASE = SITE_ROOT + "catalogue/"
 
-def get_book_category(book_url):
-    """Busca a categoria de um livro específico"""
+# Cache HTTP em disco (ETag/Last-Modified) e checkpoints de progresso
+CACHE_DIR = ".scraper_cache"
+
+# Configuração do modo assíncrono
+ASYNC_CONCURRENCY = 16  # Requisições simultâneas no máximo
+ASYNC_RATE_LIMIT = 50.0  # Requisições por segundo por host
+ASYNC_MAX_RETRIES = 3  # Novas tentativas em erro de rede, 429 ou 5xx
+ASYNC_BACKOFF = 0.5  # Espera inicial (segundos) entre tentativas, dobra a cada uma
+
+# Backend de extração de HTML usado pelas funções parse_* (ver extractors.py)
+extractor = get_extractor()
+
+
+def set_extractor(name):
+    """Troca o backend de extração de HTML (ex: "bs4" ou "lxml")"""
+    global extractor
+    extractor = get_extractor(name)
+
+
+def parse_listing_page(html, site_root=SITE_ROOT, page_url=None):
+    """Extrai os livros de uma página de listagem
+
+    Retorna uma lista de (dados do livro sem categoria, URL da página do livro).
+    """
+    return extractor.parse_listing_page(html, site_root, page_url)
+
+
+def parse_category_links(html):
+    """Lista (nome, link) das categorias no menu lateral"""
+    return extractor.parse_category_links(html)
+
+
+def parse_page_count(html):
+    """Lê o total de páginas do texto "Page 1 of 50" (None se não encontrar)"""
+    return extractor.parse_page_count(html)
+
+
+def parse_book_category(html):
+    """Extrai a categoria do breadcrumb da página de um livro"""
+    return extractor.parse_book_category(html)
+
+
+def make_book_row(book_data, category):
+    """Monta a linha final do livro, na ordem de colunas do CSV"""
+    return {
+        'title': book_data['title'],
+        'price': book_data['price'],
+        'rating': book_data['rating'],
+        'availability': book_data['availability'],
+        'category': category,
+        'image_url': book_data['image_url'],
+    }
+
+
+class HttpCache:
+    """Cache HTTP em disco: guarda o corpo, o ETag e o Last-Modified de cada URL
+
+    Permite fazer GETs condicionais: se a página não mudou, o servidor
+    responde 304 sem corpo e o conteúdo vem do disco.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = os.path.join(directory, 'http')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.json', base + '.body'
+
+    def conditional_headers(self, url):
+        """Headers If-None-Match / If-Modified-Since para a URL (vazio se não está no cache)"""
+        meta_path, body_path = self._paths(url)
+        if not os.path.exists(meta_path) or not os.path.exists(body_path):
+            return {}
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load(self, url):
+        """Corpo guardado da URL (None se não existe)"""
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def store(self, url, headers, content):
+        """Guarda a resposta 200 se ela tiver ETag ou Last-Modified"""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Corpo primeiro e metadados depois, cada um com rename atômico
+        _write_atomic(body_path, content)
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified}
+        _write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+
+class Checkpoint:
+    """Livros já coletados de cada página de listagem, gravados em disco
+
+    Cada página concluída vira uma linha JSON no arquivo, então uma execução
+    interrompida retoma a partir das páginas que ainda faltam.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}  # número da página -> livros já coletados
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        self.pages[entry['page']] = entry['books']
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Linha incompleta de uma execução interrompida
+            if self.pages:
+                print(f"Retomando: {len(self.pages)} páginas já coletadas em {path}")
+
+    def save(self, page, books):
+        """Grava os livros de uma página concluída"""
+        self.pages[page] = books
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'page': page, 'books': books}, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def clear(self):
+        """Remove o checkpoint depois de uma execução completa"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def checkpoint_path(cache_dir, site_root):
+    """Arquivo de checkpoint de um site dentro do diretório de cache"""
+    key = hashlib.sha1(site_root.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, f'checkpoint-{key}.jsonl')
+
+
+def _write_atomic(path, data):
+    """Escreve em um arquivo temporário e renomeia por cima do destino"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def cached_get(session, url, cache=None):
+    """GET condicional usando o cache em disco
+
+    Retorna (status, conteúdo, veio_do_cache). Um 304 vira status 200
+    com o corpo guardado no cache.
+    """
+    headers = cache.conditional_headers(url) if cache else {}
+    response = session.get(url, headers=headers)
+
+    if response.status_code == 304 and cache:
+        content = cache.load(url)
+        if content is not None:
+            return 200, content, True
+        response = session.get(url)  # Cache incompleto: baixa de novo
+
+    if response.status_code == 200 and cache:
+        cache.store(url, response.headers, response.content)
+    return response.status_code, response.content, False
+
+
+def get_book_category(book_url, session=requests, cache=None):
+    """Busca a categoria de um livro específico
+
+    Retorna (categoria, veio_do_cache).
+    """
     try:
-        response = requests.get(book_url)
-        if response.status_code != 200:
-            return "Unknown"
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        # A categoria está no breadcrumb
-        breadcrumb = soup.find('ul', class_='breadcrumb')
-        if breadcrumb:
-            # Pega o penúltimo item (último é o título do livro)
-            category_link = breadcrumb.find_all('a')
-            if len(category_link) >= 3:
-                return category_link[2].text.strip()
-        return "Unknown"
+        status, content, from_cache = cached_get(session, book_url, cache)
+        if status != 200:
+            return "Unknown", from_cache
+        return parse_book_category(content), from_cache
     except:
-        return "Unknown"
+        return "Unknown", False
+
+def scrape_books(cache=None, checkpoint=None, site_root=SITE_ROOT):
+    """Função principal que faz o scraping de todos os livros
 
-def scrape_books():
-    """Função principal que faz o scraping de todos os livros"""
+    Com `cache`, usa GETs condicionais (páginas sem mudança custam só um 304).
+    Com `checkpoint`, pula as páginas já coletadas em uma execução anterior.
+    `site_root` permite apontar para outro servidor (ex: scripts/fixture_site.py).
+    """
     all_books = []  # Lista para guardar todos os livros
     page = 1  # Começa na página 1
+    session = requests.Session()  # Reaproveita a conexão entre requisições
+    base_url = site_root + "catalogue/page-{}.html"
 
     print("Iniciando scraping com categorias...")
     print("ATENÇÃO: Isso vai demorar ~10 minutos para processar 1000 livros")
+    print("Dica: use --async para o modo concorrente (bem mais rápido)")
 
     while True:
+        # Página já coletada em uma execução anterior
+        if checkpoint and page in checkpoint.pages:
+            all_books.extend(checkpoint.pages[page])
+            page += 1
+            continue
+
         # Monta a URL da página atual
-        url = BASE_URL.format(page)
+        url = base_url.format(page)
         print(f"\nScraping página {page}...")
 
         # Faz requisição HTTP
-        response = requests.get(url)
+        status, content, page_cached = cached_get(session, url, cache)
 
         # Se deu erro 404, acabaram as páginas
-        if response.status_code == 404:
+        if status == 404:
             break
 
-        # Transforma HTML em objeto BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Extrai os livros da página
+        books = parse_listing_page(content, site_root)
+
+        # Para cada livro, busca a categoria
+        page_books = []
+        for idx, (book_data, book_url) in enumerate(books, 1):
+            # Busca a categoria (isso adiciona uma requisição extra por livro)
+            category, from_cache = get_book_category(book_url, session, cache)
+
+            print(f"  [{idx}/{len(books)}] {book_data['title'][:40]}... - {category}")
 
-        # Encontra todos os livros na página
-        books = soup.find_all('article', class_='product_pod')
+            # Adiciona à lista
+            page_books.append(make_book_row(book_data, category))
 
-        # Para cada livro, extrai os dados
-        for idx, book in enumerate(books, 1):
-            # Extrai título
-            title = book.h3.a['title']
+            # Pequeno delay para não sobrecarregar (um 304 não precisa)
+            if not from_cache:
+                time.sleep(0.1)
 
-            # Extrai preço (remove o símbolo £)
-            price = book.find('p', class_='price_color').text.strip('£')
+        all_books.extend(page_books)
+        if checkpoint:
+            checkpoint.save(page, page_books)
 
-            # Extrai rating (converte texto para número)
-            rating_class = book.find('p', class_='star-rating')['class'][1]
-            rating_map = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
-            rating = rating_map.get(rating_class, 0)
+        page += 1  # Vai para próxima página
+        if not page_cached:
+            time.sleep(0.5)  # Espera meio segundo entre páginas
 
-            # Extrai disponibilidade
-            availability = book.find('p', class_='instock availability').text.strip()
+    print(f"\nTotal de livros coletados: {len(all_books)}")
+    return all_books
 
-            # Extrai URL da imagem
-            image_url = "https://books.toscrape.com/" + book.find('img')['src'].replace('../', '')
 
-            # Extrai URL do livro para buscar categoria
-            book_link = book.h3.a['href']
-            book_url = SITE_BASE + book_link
+# ========== MODO ASSÍNCRONO ==========
 
-            # Busca a categoria (isso adiciona uma requisição extra por livro)
-            category = get_book_category(book_url)
+class HostRateLimiter:
+    """Limita as requisições por segundo para cada host"""
 
-            print(f"  [{idx}/{len(books)}] {title[:40]}... - {category}")
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = {}  # host -> próximo horário livre
+        self.lock = asyncio.Lock()
 
-            # Cria um dicionário com todos os dados
-            book_data = {
-                'title': title,
-                'price': price,
-                'rating': rating,
-                'availability': availability,
-                'category': category,
-                'image_url': image_url
-            }
+    async def wait(self, url):
+        """Espera até o próximo horário livre do host da URL"""
+        if not self.interval:
+            return
 
-            # Adiciona à lista
-            all_books.append(book_data)
+        host = urlsplit(url).netloc
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
 
-            # Pequeno delay para não sobrecarregar
-            time.sleep(0.1)
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
-        page += 1  # Vai para próxima página
-        time.sleep(0.5)  # Espera meio segundo entre páginas
 
-    print(f"\nTotal de livros coletados: {len(all_books)}")
+async def fetch(client, url, semaphore, limiter, max_retries=ASYNC_MAX_RETRIES, headers=None):
+    """Faz um GET com limite de concorrência, rate limit e novas tentativas com backoff
+
+    Retorna a resposta (inclusive 404) ou None se todas as tentativas falharem.
+    """
+    for attempt in range(max_retries + 1):
+        await limiter.wait(url)
+        try:
+            async with semaphore:
+                response = await client.get(url, headers=headers)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+        except httpx.TransportError:
+            pass
+
+        if attempt < max_retries:
+            # Backoff exponencial com um pouco de aleatoriedade
+            delay = ASYNC_BACKOFF * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    return None
+
+
+async def fetch_cached(client, url, semaphore, limiter, cache=None):
+    """Versão assíncrona de cached_get: (status, conteúdo) ou None se falhou"""
+    headers = cache.conditional_headers(url) if cache else {}
+    response = await fetch(client, url, semaphore, limiter, headers=headers)
+    if response is None:
+        return None
+
+    if response.status_code == 304 and cache:
+        content = cache.load(url)
+        if content is not None:
+            return 200, content
+        response = await fetch(client, url, semaphore, limiter)  # Cache incompleto
+        if response is None:
+            return None
+
+    if response.status_code == 200 and cache:
+        cache.store(url, response.headers, response.content)
+    return response.status_code, response.content
+
+
+async def fetch_category(client, book_url, semaphore, limiter, cache=None):
+    """Versão assíncrona de get_book_category"""
+    result = await fetch_cached(client, book_url, semaphore, limiter, cache)
+    if result is None or result[0] != 200:
+        return "Unknown"
+    try:
+        return parse_book_category(result[1])
+    except Exception:
+        return "Unknown"
+
+
+async def scrape_books_async(
+    site_root=SITE_ROOT,
+    concurrency=ASYNC_CONCURRENCY,
+    rate_limit=ASYNC_RATE_LIMIT,
+    cache=None,
+    checkpoint=None,
+):
+    """Faz o mesmo scraping de scrape_books, com requisições concorrentes
+
+    Usa um único cliente HTTP com conexões keep-alive reaproveitadas,
+    no máximo `concurrency` requisições ao mesmo tempo e `rate_limit`
+    requisições por segundo por host. O resultado tem os mesmos livros,
+    na mesma ordem, que o modo sequencial. `cache` e `checkpoint`
+    funcionam como em scrape_books.
+    """
+    base_url = site_root + "catalogue/page-{}.html"
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(rate_limit)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    print(f"Iniciando scraping assíncrono ({concurrency} conexões, {rate_limit:g} req/s)...")
+    start = time.perf_counter()
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+
+        async def fetch_listing(page):
+            """Baixa uma página de listagem: conteúdo, ou None se for 404"""
+            result = await fetch_cached(client, base_url.format(page), semaphore, limiter, cache)
+            if result is not None and result[0] == 404:
+                return None
+            if result is None or result[0] != 200:
+                raise RuntimeError(f"Falha ao baixar a página {page}")
+            return result[1]
+
+        async def scrape_page(page, content=None):
+            """Coleta os livros de uma página (com categorias) e grava o checkpoint"""
+            if checkpoint and page in checkpoint.pages:
+                return checkpoint.pages[page]
+
+            if content is None:
+                content = await fetch_listing(page)
+            books = parse_listing_page(content, site_root)
+            categories = await asyncio.gather(*(
+                fetch_category(client, book_url, semaphore, limiter, cache)
+                for _, book_url in books
+            ))
+            page_books = [make_book_row(book_data, category) for (book_data, _), category in zip(books, categories)]
+            if checkpoint:
+                checkpoint.save(page, page_books)
+            return page_books
+
+        # A primeira página informa o total ("Page 1 of 50")
+        first = await fetch_listing(1)
+        if first is None:
+            print("Nenhuma página encontrada!")
+            return []
+
+        page_count = parse_page_count(first)
+        if page_count:
+            pages = await asyncio.gather(
+                scrape_page(1, first),
+                *(scrape_page(page) for page in range(2, page_count + 1)),
+            )
+        else:
+            # Sem o total de páginas, segue uma a uma até o 404
+            pages = [await scrape_page(1, first)]
+            page = 2
+            while True:
+                if not (checkpoint and page in checkpoint.pages):
+                    content = await fetch_listing(page)
+                    if content is None:
+                        break
+                    pages.append(await scrape_page(page, content))
+                else:
+                    pages.append(checkpoint.pages[page])
+                page += 1
+
+    all_books = [book for page_books in pages for book in page_books]
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(pages)} páginas, total de livros coletados: {len(all_books)} em {elapsed:.1f}s")
+    return all_books
+
+
+async def scrape_books_by_category_async(
+    site_root=SITE_ROOT,
+    concurrency=ASYNC_CONCURRENCY,
+    rate_limit=ASYNC_RATE_LIMIT,
+    cache=None,
+):
+    """Scraping guiado por categorias, sem abrir a página de cada livro
+
+    Lê as categorias do menu lateral e percorre a listagem paginada de
+    cada uma, atribuindo a categoria pelo contexto da listagem. As
+    páginas do catálogo geral continuam sendo lidas para manter os
+    livros na mesma ordem do CSV gerado pelos outros modos. São cerca
+    de 100 requisições em vez de ~1.050; só livros que não aparecem em
+    nenhuma categoria têm a página própria consultada.
+    """
+    base_url = site_root + "catalogue/page-{}.html"
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(rate_limit)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    requests_made = 0
+
+    print(f"Iniciando scraping por categorias ({concurrency} conexões, {rate_limit:g} req/s)...")
+    start = time.perf_counter()
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+
+        async def get_page(url):
+            """Baixa uma página que precisa existir"""
+            nonlocal requests_made
+            requests_made += 1
+            result = await fetch_cached(client, url, semaphore, limiter, cache)
+            if result is None or result[0] != 200:
+                raise RuntimeError(f"Falha ao baixar {url}")
+            return result[1]
+
+        async def scrape_category(name, url):
+            """Percorre todas as páginas de uma categoria e retorna as URLs dos livros"""
+            first = await get_page(url)
+            pages = [(url, first)]
+            page_count = parse_page_count(first) or 1
+            if page_count > 1:
+                urls = [urljoin(url, f"page-{page}.html") for page in range(2, page_count + 1)]
+                contents = await asyncio.gather(*(get_page(page_url) for page_url in urls))
+                pages.extend(zip(urls, contents))
+            return [
+                book_url
+                for page_url, content in pages
+                for _, book_url in parse_listing_page(content, site_root, page_url)
+            ]
+
+        # A primeira página do catálogo tem o total de páginas e o menu de categorias
+        first_url = base_url.format(1)
+        first = await get_page(first_url)
+        page_count = parse_page_count(first) or 1
+        categories = [(name, urljoin(first_url, href)) for name, href in parse_category_links(first)]
+
+        listing_task = asyncio.gather(*(get_page(base_url.format(page)) for page in range(2, page_count + 1)))
+        category_task = asyncio.gather(*(scrape_category(name, url) for name, url in categories))
+        contents, category_books = await asyncio.gather(listing_task, category_task)
+
+        # URL do livro -> categoria, a partir das listagens de cada categoria
+        category_of = {}
+        for (name, _), book_urls in zip(categories, category_books):
+            for book_url in book_urls:
+                category_of.setdefault(book_url, name)
+
+        books = [item for content in [first, *contents] for item in parse_listing_page(content, site_root)]
+
+        # Livros fora de todas as categorias: consulta a página do livro
+        missing = [book_url for _, book_url in books if book_url not in category_of]
+        if missing:
+            print(f"{len(missing)} livros sem categoria na listagem, buscando páginas individuais...")
+            requests_made += len(missing)
+            found = await asyncio.gather(*(
+                fetch_category(client, book_url, semaphore, limiter, cache) for book_url in missing
+            ))
+            category_of.update(zip(missing, found))
+
+    all_books = [make_book_row(book_data, category_of[book_url]) for book_data, book_url in books]
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(categories)} categorias, {requests_made} requisições, "
+          f"total de livros coletados: {len(all_books)} em {elapsed:.1f}s")
     return all_books
 
 
 def save_to_csv(books, filename='data/books.csv'):
-    """Salva os livros em um arquivo CSV"""
+    """Salva os livros em um arquivo CSV
+
+    Escreve num arquivo temporário e troca pelo definitivo com os.replace,
+    então a API (que recarrega o CSV quando ele muda) nunca lê um arquivo
+    pela metade.
+    """
     if not books:
         print("Nenhum livro para salvar!")
         return
 
-    # Abre arquivo CSV para escrita
-    with open(filename, 'w', newline='', encoding='utf-8') as file:
+    # Abre o arquivo temporário para escrita (mesmo diretório: o rename é atômico)
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', newline='', encoding='utf-8') as file:
         # Define as colunas (agora com category)
         fieldnames = ['title', 'price', 'rating', 'availability', 'category', 'image_url']
         writer = csv.DictWriter(file, fieldnames=fieldnames)
@@ -119,12 +548,61 @@ def save_to_csv(books, filename='data/books.csv'):
         writer.writeheader()
         # Escreve todos os livros
         writer.writerows(books)
+    os.replace(tmp_filename, filename)
 
     print(f"Dados salvos em {filename}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraper do books.toscrape.com")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="usa o modo assíncrono concorrente")
+    parser.add_argument('--by-category', action='store_true',
+                        help="percorre as listagens de cada categoria em vez de abrir a página de cada livro (implica --async)")
+    parser.add_argument('--site', default=SITE_ROOT,
+                        help="URL raiz do site (ex: python scripts/fixture_site.py --serve 8001)")
+    parser.add_argument('--concurrency', type=int, default=ASYNC_CONCURRENCY,
+                        help="requisições simultâneas no modo assíncrono")
+    parser.add_argument('--rate', type=float, default=ASYNC_RATE_LIMIT,
+                        help="requisições por segundo por host no modo assíncrono (0 = sem limite)")
+    parser.add_argument('--output', default='data/books.csv', help="arquivo CSV de saída")
+    parser.add_argument('--parser', choices=available_extractors(), default=default_extractor_name(),
+                        help="backend de extração de HTML (padrão: o mais rápido disponível)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR,
+                        help="diretório do cache HTTP e dos checkpoints")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="não usa cache HTTP nem checkpoints (baixa tudo do zero)")
+    parser.add_argument('--fresh', action='store_true',
+                        help="ignora o checkpoint de uma execução interrompida")
+    args = parser.parse_args()
+
+    set_extractor(args.parser)
+    if args.by_category:
+        args.use_async = True
+    site_root = args.site if args.site.endswith('/') else args.site + '/'
+
+    cache = checkpoint = None
+    if not args.no_cache:
+        cache = HttpCache(args.cache_dir)
+    # O modo por categorias não usa o checkpoint por página (são ~100
+    # requisições, e o cache HTTP já evita baixar de novo o que não mudou);
+    # o checkpoint de uma execução --async interrompida fica intacto para ela
+    if not args.no_cache and not args.by_category:
+        checkpoint = Checkpoint(checkpoint_path(args.cache_dir, site_root))
+        if args.fresh:
+            checkpoint.clear()
+            checkpoint = Checkpoint(checkpoint.path)
+
     # Executa o scraping
-    books = scrape_books()
+    if args.by_category:
+        books = asyncio.run(scrape_books_by_category_async(site_root, args.concurrency, args.rate, cache))
+    elif args.use_async:
+        books = asyncio.run(scrape_books_async(site_root, args.concurrency, args.rate, cache, checkpoint))
+    else:
+        books = scrape_books(cache, checkpoint, site_root)
     # Salva no CSV
-    save_to_csv(books)
+    save_to_csv(books, args.output)
+
+    # Execução completa: a próxima começa do zero (mas ainda com o cache HTTP)
+    if checkpoint:
+        checkpoint.clear()